@@ -0,0 +1,210 @@
+"""Asyncio bulk crawler for investor homepages.
+
+Crawls many websites concurrently with a global connection cap, a per-host cap,
+a global request rate limit, separate DNS/connect/read timeouts and retries
+with jittered exponential backoff. Each result (extracted visible text, or the
+error) is written to a ``CrawlStore`` that the LLM enrichment stage reads from,
+so a handful of dead domains can no longer stall the whole run.
+"""
+import asyncio
+import os
+import random
+import socket
+import time
+from typing import Iterable, List, Optional
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+from html_text import extract_visible_text
+from sqlite_cache import SQLiteCache, cache_path
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Failed fetches are retried by later crawls once they are this old (seconds)
+FAILED_RETRY_AFTER = 3600.0
+
+
+class CrawlStore:
+    """Crawl results keyed by the website value from the sheet."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.cache = SQLiteCache(path or os.getenv("CRAWL_STORE_PATH", cache_path("crawl.sqlite3")))
+
+    def get(self, url: str) -> Optional[dict]:
+        return self.cache.get_json(url.strip())
+
+    def put(self, url: str, status: Optional[int], text: str = "", error: str = "") -> None:
+        self.cache.set_json(url.strip(), {
+            "status": status,
+            "text": text,
+            "error": error,
+            "fetched_at": time.time(),
+        })
+
+    def is_fresh(self, url: str, max_age: Optional[float], failed_max_age: Optional[float] = FAILED_RETRY_AFTER) -> bool:
+        """Whether ``url`` has an entry younger than ``max_age`` (None: any age).
+
+        Entries recording an error use ``failed_max_age`` instead, so a domain
+        that timed out once is crawled again by a later run.
+        """
+        entry = self.get(url)
+        if entry is None:
+            return False
+        age = time.time() - entry.get("fetched_at", 0)
+        if entry.get("error") and failed_max_age is not None:
+            max_age = failed_max_age if max_age is None else min(max_age, failed_max_age)
+        return max_age is None or age < max_age
+
+
+class _TimeoutResolver(AbstractResolver):
+    # aiohttp has no DNS-specific timeout; bound the resolver call itself
+    def __init__(self, timeout: float) -> None:
+        self._resolver = DefaultResolver()
+        self._timeout = timeout
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET):
+        return await asyncio.wait_for(self._resolver.resolve(host, port, family), self._timeout)
+
+    async def close(self) -> None:
+        await self._resolver.close()
+
+
+class _RateLimiter:
+    """Spaces request starts to at most ``rate`` per second across all workers."""
+
+    def __init__(self, rate: float) -> None:
+        self._interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _with_scheme(url: str) -> str:
+    url = url.strip()
+    return url if url.startswith(("http://", "https://")) else f"https://{url}"
+
+
+async def _read_capped(response, max_bytes: int) -> bytes:
+    # content.read(n) only returns what is buffered so far; keep reading until EOF or the cap
+    chunks, size = [], 0
+    async for chunk in response.content.iter_chunked(64 * 1024):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes:
+            break
+    return b"".join(chunks)[:max_bytes]
+
+
+async def _fetch_one(session, limiter, url, retries, max_bytes, text_limit, backoff):
+    last_error = ""
+    status = None
+    for attempt in range(retries + 1):
+        if attempt:
+            # Exponential backoff with full jitter
+            await asyncio.sleep(backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+        await limiter.wait()
+        try:
+            async with session.get(_with_scheme(url), allow_redirects=True) as response:
+                status = response.status
+                if status in RETRY_STATUS:
+                    last_error = f"HTTP {status}"
+                    continue
+                if status >= 400:
+                    return status, "", f"HTTP {status}"
+                body = await _read_capped(response, max_bytes)
+                try:
+                    encoding = response.get_encoding()
+                except RuntimeError:
+                    encoding = "utf-8"
+                html = body.decode(encoding, errors="replace")
+            text = await asyncio.to_thread(extract_visible_text, html, text_limit)
+            return status, text, ""
+        except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeError, LookupError) as e:
+            last_error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+    return status, "", last_error
+
+
+async def crawl(
+    urls: Iterable[str],
+    store: CrawlStore,
+    concurrency: int = 64,
+    per_host: int = 2,
+    rate: float = 20.0,
+    dns_timeout: float = 5.0,
+    connect_timeout: float = 5.0,
+    read_timeout: float = 10.0,
+    total_timeout: float = 30.0,
+    retries: int = 2,
+    backoff: float = 1.0,
+    max_bytes: int = 2 * 1024 * 1024,
+    text_limit: int = 2000,
+    refresh_after: Optional[float] = None,
+    retry_failed_after: Optional[float] = FAILED_RETRY_AFTER,
+    on_result=None,
+) -> dict:
+    """Crawl ``urls`` into ``store`` and return counts of ok/failed/skipped pages.
+
+    URLs already in the store are skipped unless older than ``refresh_after``
+    seconds (None: stored pages are kept forever); failed fetches are retried
+    once older than ``retry_failed_after`` seconds.
+    """
+    seen = set()
+    todo: List[str] = []
+    skipped = 0
+    for url in urls:
+        if not isinstance(url, str) or not url.strip() or url.strip() in seen:
+            continue
+        seen.add(url.strip())
+        if store.is_fresh(url, refresh_after, retry_failed_after):
+            skipped += 1
+        else:
+            todo.append(url.strip())
+
+    stats = {"ok": 0, "failed": 0, "skipped": skipped}
+    if not todo:
+        return stats
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for url in todo:
+        queue.put_nowait(url)
+
+    limiter = _RateLimiter(rate)
+    connector = aiohttp.TCPConnector(
+        limit=concurrency,
+        limit_per_host=per_host,
+        ttl_dns_cache=300,
+        resolver=_TimeoutResolver(dns_timeout),
+    )
+    timeout = aiohttp.ClientTimeout(total=total_timeout, sock_connect=connect_timeout, sock_read=read_timeout)
+    headers = {"User-Agent": "Mozilla/5.0 (compatible; AutoPitchAgent/1.0)"}
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+        async def worker():
+            while True:
+                try:
+                    url = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                status, text, error = await _fetch_one(session, limiter, url, retries, max_bytes, text_limit, backoff)
+                store.put(url, status, text, error)
+                stats["failed" if error else "ok"] += 1
+                if on_result is not None:
+                    on_result(url, status, error)
+
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, len(todo)))))
+    return stats
+
+
+def crawl_urls(urls: Iterable[str], store: Optional[CrawlStore] = None, **options) -> dict:
+    """Blocking wrapper around ``crawl`` for scripts."""
+    return asyncio.run(crawl(urls, store or CrawlStore(), **options))
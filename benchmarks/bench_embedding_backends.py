@@ -0,0 +1,99 @@
+"""Benchmark embedding backends against the full-precision torch reference.
+
+    python benchmarks/bench_embedding_backends.py
+    python benchmarks/bench_embedding_backends.py --backends torch onnx onnx-int8 --limit 2000 --k 10
+
+Encodes investor theses from ``investor_data.pkl`` with every backend and
+reports load time, throughput, cosine similarity to the torch vectors (checked
+against ``embedding_backend.MIN_COSINE``) and top-k agreement with torch in
+two setups: ``self`` (corpus and queries both from the backend, i.e. an index
+rebuilt with it) and ``vs torch index`` (backend queries against torch corpus
+vectors, i.e. switching only the query side of an existing index).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from embedding_backend import BACKENDS, MIN_COSINE, load_embedder  # noqa: E402
+from m2_investor_match import DATA_PATH, MODEL_NAME  # noqa: E402
+
+
+def load_texts(path, limit):
+    df = pd.read_pickle(path)
+    column = "final_investment_thesis_clean" if "final_investment_thesis_clean" in df.columns \
+        else "Final Investment thesis"
+    texts = [t for t in df[column].astype(str) if t.strip()]
+    return texts[:limit] if limit else texts
+
+
+def encode(model, texts, batch_size):
+    vectors = np.asarray(model.encode(texts, batch_size=batch_size), dtype="float32")
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def top_k(queries, corpus, k):
+    scores = queries @ corpus.T
+    part = np.argpartition(-scores, kth=min(k, corpus.shape[0] - 1), axis=1)[:, :k]
+    return part
+
+
+def agreement(a, b, k):
+    return float(np.mean([len(np.intersect1d(x, y)) / k for x, y in zip(a, b)]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=os.path.join(ROOT, DATA_PATH))
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--limit", type=int, default=1000, help="Theses encoded per backend (0 = all).")
+    parser.add_argument("--queries", type=int, default=100, help="Theses reused as queries for top-k agreement.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    texts = load_texts(args.data, args.limit)
+    if not texts:
+        sys.exit(f"No theses in {args.data}")
+    k = min(args.k, len(texts))
+    rng = np.random.default_rng(0)
+    query_rows = rng.choice(len(texts), size=min(args.queries, len(texts)), replace=False)
+    print(f"{MODEL_NAME}: {len(texts)} theses, {len(query_rows)} queries, k={k}\n")
+
+    # torch first: it is the reference for every other column
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    reference = None
+    print(f"{'backend':<11} {'load s':>7} {'texts/s':>8} {'min cos':>8} {'mean cos':>9} "
+          f"{'top-k self':>11} {'vs torch index':>15}  ok")
+    for backend in backends:
+        try:
+            started = time.perf_counter()
+            model = load_embedder(MODEL_NAME, backend)
+            load_s = time.perf_counter() - started
+        except Exception as e:  # missing optional runtime (onnxruntime/optimum)
+            print(f"{backend:<11} skipped: {e}")
+            continue
+        model.encode(texts[:args.batch_size], batch_size=args.batch_size)  # warm up
+        started = time.perf_counter()
+        vectors = encode(model, texts, args.batch_size)
+        rate = len(texts) / (time.perf_counter() - started)
+
+        if reference is None:
+            reference = vectors
+            truth = top_k(reference[query_rows], reference, k)
+        cosine = np.sum(vectors * reference, axis=1)
+        self_agree = agreement(top_k(vectors[query_rows], vectors, k), truth, k)
+        mixed_agree = agreement(top_k(vectors[query_rows], reference, k), truth, k)
+        ok = "yes" if cosine.min() >= MIN_COSINE[backend] - 1e-6 else f"no (< {MIN_COSINE[backend]})"
+        print(f"{backend:<11} {load_s:>7.1f} {rate:>8.1f} {cosine.min():>8.4f} {cosine.mean():>9.4f} "
+              f"{self_agree:>11.3f} {mixed_agree:>15.3f}  {ok}")
+
+
+if __name__ == "__main__":
+    main()
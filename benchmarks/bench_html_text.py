@@ -0,0 +1,89 @@
+"""Benchmark homepage text extraction against the original BeautifulSoup path.
+
+    python benchmarks/bench_html_text.py
+    python benchmarks/bench_html_text.py --limit 1500 --repeat 50
+    python benchmarks/bench_html_text.py --export-page-cache 100   # grow the corpus from .cache/pages.sqlite3
+
+Reports ms/page for every available backend, the speed-up over ``bs4`` and how
+many pages produce exactly the same text as ``bs4``.
+"""
+import argparse
+import glob
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from html_text import BACKENDS, available_backends  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "html_fixtures")
+
+
+def export_page_cache(limit, fixtures_dir, cache_file):
+    """Copy up to ``limit`` cached homepages into the fixture corpus."""
+    import json
+
+    conn = sqlite3.connect(cache_file)
+    rows = conn.execute("SELECT key, value FROM cache ORDER BY accessed_at DESC LIMIT ?", (limit,)).fetchall()
+    for url, value in rows:
+        text = json.loads(value.decode("utf-8")).get("text", "")
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+        with open(os.path.join(fixtures_dir, f"cached_{name}.html"), "w", encoding="utf-8") as f:
+            f.write(text)
+    print(f"Exported {len(rows)} pages from {cache_file}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--limit", type=int, default=2000, help="Characters kept (scrapers use 1500/2000).")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--export-page-cache", type=int, default=0, metavar="N")
+    parser.add_argument("--page-cache", default=os.path.join(ROOT, ".cache", "pages.sqlite3"))
+    args = parser.parse_args(argv)
+
+    if args.export_page_cache:
+        export_page_cache(args.export_page_cache, args.fixtures, args.page_cache)
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(args.fixtures, "*.html"))):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append((os.path.basename(path), f.read()))
+    if not pages:
+        sys.exit(f"No *.html fixtures in {args.fixtures}")
+    total_kb = sum(len(html) for _, html in pages) / 1024
+    print(f"{len(pages)} pages, {total_kb:.0f} KB total, limit={args.limit}, repeat={args.repeat}\n")
+
+    # bs4 first: it is the baseline for the speed-up column
+    backends = sorted(available_backends(), key=lambda b: b != "bs4")
+    reference = {}
+    if "bs4" in backends:
+        try:
+            reference = {name: BACKENDS["bs4"](html, args.limit) for name, html in pages}
+        except ImportError:
+            backends.remove("bs4")
+
+    timings = {}
+    print(f"{'backend':<12} {'ms/page':>9} {'speedup':>8} {'same as bs4':>12}")
+    for backend in backends:
+        extract = BACKENDS[backend]
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for _, html in pages:
+                extract(html, args.limit)
+        timings[backend] = (time.perf_counter() - start) * 1000 / (args.repeat * len(pages))
+
+        same = "-"
+        if reference:
+            matches = sum(extract(html, args.limit) == reference[name] for name, html in pages)
+            same = f"{matches}/{len(pages)}"
+        speedup = f"{timings['bs4'] / timings[backend]:.1f}x" if "bs4" in timings else "-"
+        print(f"{backend:<12} {timings[backend]:>9.3f} {speedup:>8} {same:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""BM25 over investor theses as a precomputed sparse impact matrix.
+
+``build_bm25`` tokenizes every thesis once and stores each (investor, term)
+BM25 weight in a column-compressed ``scipy.sparse`` matrix, with the vocabulary
+in a JSON sidecar. A query then only touches the posting columns of its own
+terms: one ``np.bincount`` over those postings gives every investor's score,
+which keeps lexical search in the low milliseconds for 100k investors.
+Rows follow the order of ``investor_data.pkl`` / the investor store.
+"""
+import json
+import os
+import re
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-+.][a-z0-9]+)*\+*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or our that the their them they "
+    "this to was we were which will with within you your".split()
+)
+
+
+def tokenize(text):
+    """Lowercased terms; keeps compounds like ``risc-v``, ``web3`` and ``c++`` whole."""
+    if not isinstance(text, str):
+        return []
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def vocab_path(path):
+    return f"{os.path.splitext(path)[0]}.vocab.json"
+
+
+class BM25Index:
+    """Lexical scorer over a ``(documents x terms)`` CSC matrix of BM25 weights."""
+
+    def __init__(self, matrix, terms, k1=1.2, b=0.75):
+        self.matrix = sparse.csc_matrix(matrix, dtype=np.float32)
+        self.terms = list(terms)
+        self.vocab = {t: i for i, t in enumerate(self.terms)}
+        self.k1 = k1
+        self.b = b
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def scores(self, text):
+        """Dense BM25 score of every document for ``text`` (zeros for no overlap)."""
+        cols = sorted({self.vocab[t] for t in tokenize(text) if t in self.vocab})
+        if not cols:
+            return np.zeros(len(self), dtype=np.float32)
+        indptr, indices, data = self.matrix.indptr, self.matrix.indices, self.matrix.data
+        spans = [slice(indptr[c], indptr[c + 1]) for c in cols]
+        docs = np.concatenate([indices[s] for s in spans])
+        weights = np.concatenate([data[s] for s in spans])
+        return np.bincount(docs, weights=weights, minlength=len(self)).astype(np.float32)
+
+    def search(self, text, k=50, scores=None):
+        """Top ``k`` ``(rows, scores)`` by BM25, best first; documents scoring 0 are never returned."""
+        scores = self.scores(text) if scores is None else scores
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        order = np.argsort(-scores[candidates], kind="stable")
+        rows = candidates[order]
+        return rows, scores[rows]
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"  # save_npz only accepts names ending in .npz
+        sparse.save_npz(tmp_path, self.matrix)
+        os.replace(tmp_path, path)
+        tmp_vocab = f"{vocab_path(path)}.tmp"
+        with open(tmp_vocab, "w", encoding="utf-8") as f:
+            json.dump({"terms": self.terms, "k1": self.k1, "b": self.b, "rows": len(self)}, f, ensure_ascii=False)
+        os.replace(tmp_vocab, vocab_path(path))
+
+    @classmethod
+    def load(cls, path):
+        with open(vocab_path(path), encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(sparse.load_npz(path), meta["terms"], meta.get("k1", 1.2), meta.get("b", 0.75))
+
+
+def build_bm25(texts, k1=1.2, b=0.75):
+    """BM25 index over ``texts`` (Lucene idf, term frequencies saturated by ``k1``, length-normalized by ``b``)."""
+    vocab = {}
+    rows, cols, tfs, lengths = [], [], [], []
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            rows.append(row)
+            cols.append(vocab.setdefault(term, len(vocab)))
+            tfs.append(tf)
+
+    n_docs = len(lengths)
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    tfs = np.asarray(tfs, dtype=np.float32)
+    lengths = np.asarray(lengths, dtype=np.float32)
+    avgdl = lengths.mean() if n_docs and lengths.mean() > 0 else 1.0
+
+    df = np.bincount(cols, minlength=len(vocab)).astype(np.float32)
+    idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+    norm = k1 * (1 - b + b * lengths[rows] / avgdl) if n_docs else np.zeros(0, dtype=np.float32)
+    weights = idf[cols] * tfs * (k1 + 1) / (tfs + norm)
+
+    matrix = sparse.csc_matrix((weights, (rows, cols)), shape=(n_docs, len(vocab)), dtype=np.float32)
+    terms = sorted(vocab, key=vocab.get)
+    return BM25Index(matrix, terms, k1, b)
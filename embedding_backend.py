@@ -0,0 +1,78 @@
+"""Selectable CPU inference backends for the thesis/summary embedder.
+
+``EMBEDDING_BACKEND`` (or the ``backend`` argument) picks one of:
+
+- ``torch``: full-precision PyTorch, the reference the index was built with.
+- ``torch-int8``: PyTorch with dynamic int8 quantization of the Linear layers.
+- ``onnx``: ONNX Runtime (``sentence-transformers>=3.2`` with ``optimum[onnxruntime]``).
+- ``onnx-int8``: ONNX Runtime with a dynamically int8-quantized export. It is
+  built once under ``.cache/onnx/`` (``EMBEDDING_ONNX_QCONFIG`` picks the
+  ``avx2``/``avx512``/``avx512_vnni``/``arm64`` kernel set).
+
+All backends produce vectors in the same space as ``torch``, so an index built
+with one can be queried with another. ``MIN_COSINE`` is the accepted per-text
+cosine similarity to the ``torch`` vectors; ``benchmarks/bench_embedding_backends.py``
+measures it together with throughput and top-k agreement.
+"""
+import os
+
+from sqlite_cache import cache_path
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+DEFAULT_BACKEND = "torch"
+
+# Accepted minimum cosine similarity to the torch embedding of the same text
+MIN_COSINE = {
+    "torch": 1.0,
+    "onnx": 0.999,
+    "torch-int8": 0.98,
+    "onnx-int8": 0.98,
+}
+
+
+def resolve_backend(backend=None):
+    backend = (backend or os.getenv("EMBEDDING_BACKEND") or DEFAULT_BACKEND).strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; choose one of {', '.join(BACKENDS)}.")
+    return backend
+
+
+def embedding_key(model_name, backend=None):
+    """Identifies the vectors a model/backend pair produces (query cache namespace)."""
+    backend = resolve_backend(backend)
+    # torch keeps the bare model name so existing cache entries stay valid
+    return model_name if backend == DEFAULT_BACKEND else f"{model_name}|{backend}"
+
+
+def _quantized_onnx_dir(model_name, qconfig):
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    target = cache_path(os.path.join("onnx", model_name.replace("/", "--")))
+    # Pinned suffix: the default one depends on the config's weight dtype (qint8/quint8)
+    file_suffix = f"int8_{qconfig}"
+    file_name = f"model_{file_suffix}.onnx"
+    if not os.path.exists(os.path.join(target, "onnx", file_name)):
+        print(f"🔧 Exporting an int8 ONNX copy of {model_name} to {target}...")
+        model = SentenceTransformer(model_name, backend="onnx")
+        model.save(target)
+        export_dynamic_quantized_onnx_model(model, qconfig, target, file_suffix=file_suffix)
+    return target, f"onnx/{file_name}"
+
+
+def load_embedder(model_name, backend=None):
+    """A ``SentenceTransformer`` for ``model_name`` running on the chosen backend."""
+    from sentence_transformers import SentenceTransformer
+
+    backend = resolve_backend(backend)
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "torch-int8":
+        import torch
+
+        model = SentenceTransformer(model_name, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx")
+    qconfig = os.getenv("EMBEDDING_ONNX_QCONFIG", "avx2")
+    path, file_name = _quantized_onnx_dir(model_name, qconfig)
+    return SentenceTransformer(path, backend="onnx", model_kwargs={"file_name": file_name})
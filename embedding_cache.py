@@ -0,0 +1,92 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from sqlite_cache import SQLiteCache, cache_path
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU of normalized query embeddings, keyed by a hash of model and text.
+
+    Holds at most ``max_entries`` vectors in memory (a 768-d vector is 3 KB).
+    With a ``persistent`` SQLiteCache tier, misses are looked up on disk before
+    falling back to the model, so Streamlit reruns and repeated CLI runs reuse
+    embeddings across processes.
+    """
+
+    def __init__(self, max_entries: int = 1024, persistent: Optional[SQLiteCache] = None) -> None:
+        self.max_entries = max(0, max_entries)
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(namespace: str, text: str) -> str:
+        # ``namespace`` identifies the embedding model (and anything else that changes the vector)
+        return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+        raw = self.persistent.get(key) if self.persistent is not None else None
+        if raw is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        vector = np.frombuffer(raw, dtype="float32")
+        self._remember(key, vector)
+        with self._lock:
+            self.hits += 1
+        return vector
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        vector = np.array(vector, dtype="float32")  # own copy, detached from the encode batch
+        vector.setflags(write=False)
+        self._remember(key, vector)
+        if self.persistent is not None:
+            self.persistent.set(key, vector.tobytes())
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def query_cache_from_env() -> Optional[QueryEmbeddingCache]:
+    """Cache configured by ``QUERY_CACHE_*`` env vars (``QUERY_CACHE_SIZE=0`` and
+    ``QUERY_CACHE_TTL=0`` disable the memory and disk tiers)."""
+    size = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+    ttl = float(os.getenv("QUERY_CACHE_TTL", str(30 * 24 * 3600)))
+    persistent = None
+    if ttl > 0:
+        persistent = SQLiteCache(
+            os.getenv("QUERY_CACHE_PATH", cache_path("query_embeddings.sqlite3")),
+            ttl_seconds=ttl,
+            max_bytes=int(float(os.getenv("QUERY_CACHE_MAX_MB", "50")) * 1024 * 1024),
+        )
+    if size <= 0 and persistent is None:
+        return None
+    return QueryEmbeddingCache(max_entries=size, persistent=persistent)
@@ -0,0 +1,153 @@
+"""Staged worker pipeline and checkpoint store for the investor enrichment job.
+
+Each stage has its own pool of worker threads and hands items to the next stage
+through a bounded queue, so a slow stage (the LLM) applies backpressure instead
+of letting scraped pages pile up in memory, and a fast stage (scraping) keeps
+running while the slow one is busy. The final sink runs in the calling thread.
+"""
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from sqlite_cache import SQLiteCache, cache_path
+
+_DONE = object()
+
+
+class EnrichmentCheckpoint:
+    """Per-row enrichment results of a sheet, kept across runs.
+
+    A row is recorded as soon as its summary exists and marked ``written`` once
+    the sheet write that carried it succeeded. On restart, written rows are
+    skipped and recorded-but-unwritten rows are sent to the sheet again without
+    going back through the LLM.
+    """
+
+    def __init__(self, job: str, path: Optional[str] = None) -> None:
+        self.job = job
+        self.cache = SQLiteCache(path or os.getenv("ENRICHMENT_CHECKPOINT_PATH",
+                                                   cache_path("enrichment_checkpoint.sqlite3")))
+
+    def _key(self, row: int) -> str:
+        return f"{self.job}#{row}"
+
+    def get(self, row: int, identity: str = "") -> Optional[dict]:
+        """The entry for sheet ``row``, if it was recorded for the same investor."""
+        entry = self.cache.get_json(self._key(row))
+        if entry is None or entry.get("identity") != identity:
+            return None
+        return entry
+
+    def record(self, row: int, summary: str, identity: str = "") -> None:
+        self.cache.set_json(self._key(row), {
+            "identity": identity,
+            "summary": summary,
+            "written": False,
+            "updated_at": time.time(),
+        })
+
+    def mark_written(self, rows: Iterable[int]) -> None:
+        for row in rows:
+            entry = self.cache.get_json(self._key(row))
+            if entry is not None and not entry.get("written"):
+                entry["written"] = True
+                entry["updated_at"] = time.time()
+                self.cache.set_json(self._key(row), entry)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+
+class Stage:
+    """``fn(key, value) -> value`` run on ``workers`` threads."""
+
+    def __init__(self, name: str, fn: Callable, workers: int = 1) -> None:
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    # Blocking put that still notices a stop request
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def run_stages(
+    items: Iterable[Tuple[object, object]],
+    stages: Sequence[Stage],
+    sink: Callable[[object, object], None],
+    queue_size: int = 32,
+) -> int:
+    """Push ``(key, value)`` items through ``stages`` and hand the results to ``sink``.
+
+    Results reach ``sink`` in completion order. An item whose stage function
+    raises is reported and dropped. Interrupting the caller (Ctrl-C) stops every
+    stage after its current item. Returns the number of items that reached ``sink``.
+    """
+    stop = threading.Event()
+    queues: List[queue.Queue] = [queue.Queue(maxsize=max(1, queue_size)) for _ in range(len(stages) + 1)]
+    threads: List[threading.Thread] = []
+
+    def feed():
+        for item in items:
+            if not _put(queues[0], item, stop):
+                return
+        for _ in range(stages[0].workers if stages else 1):
+            _put(queues[0], _DONE, stop)
+
+    def work(i: int, stage: Stage, remaining: list, lock: threading.Lock):
+        inbox, outbox = queues[i], queues[i + 1]
+        while not stop.is_set():
+            try:
+                item = inbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                break
+            key, value = item
+            try:
+                result = stage.fn(key, value)
+            except Exception as e:
+                print(f"❌ {stage.name} failed for {key}: {e}")
+                continue
+            if not _put(outbox, (key, result), stop):
+                return
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        # The last worker of a stage tells every worker of the next one to finish
+        if last:
+            downstream = stages[i + 1].workers if i + 1 < len(stages) else 1
+            for _ in range(downstream):
+                _put(outbox, _DONE, stop)
+
+    threads.append(threading.Thread(target=feed, name="feed", daemon=True))
+    for i, stage in enumerate(stages):
+        remaining, lock = [stage.workers], threading.Lock()
+        for n in range(stage.workers):
+            threads.append(threading.Thread(target=work, args=(i, stage, remaining, lock),
+                                            name=f"{stage.name}-{n}", daemon=True))
+    for thread in threads:
+        thread.start()
+
+    delivered = 0
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                break
+            sink(*item)
+            delivered += 1
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=5)
+    return delivered
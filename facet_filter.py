@@ -0,0 +1,165 @@
+"""Precomputed attribute bitmaps for filtered investor matching.
+
+For every filterable column, each distinct value gets a bitmap over the
+investor rows (``np.packbits``, one bit per investor, row order of the investor
+store). Cells holding several values ("2. Prototype, 3. Early revenue") set the bit in each
+value's bitmap. A filter is then a few bitwise ORs/ANDs over packed bytes,
+and the resulting row mask is handed to FAISS and BM25 as a search-time
+restriction instead of filtering the results afterwards.
+
+Bitmaps are built for ``FACET_COLUMNS`` and for every other text column of
+``investor_data.pkl`` with at most ``MAX_FACET_VALUES`` distinct values (e.g.
+``First cheque minimum``). Free-text and identifier columns (names, websites,
+emails, theses) are left out.
+
+Filters map a column to one value or a list of values, matched
+case-insensitively: ``{"Stage of investment": ["1. Idea or patent", "2. Prototype"],
+"Countries of investment": "Germany"}`` keeps investors matching any listed
+value in every given column. Unknown columns and values raise ``ValueError``.
+"""
+import json
+import os
+import re
+
+import numpy as np
+
+FACET_COLUMNS = (
+    "Stage of investment",
+    "Countries of investment",
+    "Global HQ",
+    "Investor type",
+)
+
+# Contact, identifier and free-text columns are never facets
+NON_FACET_COLUMNS = (
+    "Investor name",
+    "Website",
+    "Email",
+    "Investment thesis",
+    "Final Investment thesis",
+    "final_investment_thesis_clean",
+    "thesis_hash",
+    "investor_id",
+)
+# Other columns become facets when their cells hold at most this many distinct values
+MAX_FACET_VALUES = 256
+
+# Longest list of valid values quoted in an unknown-value error
+MAX_LISTED_VALUES = 30
+
+# Commas separate values, except thousands separators ("$100,000")
+_SPLIT_RE = re.compile(r"\s*(?:[;|/\n]|,(?!\d{3}\b))\s*")
+
+
+def split_values(cell):
+    """Normalized values of a (possibly multi-valued) sheet cell."""
+    if not isinstance(cell, str):
+        return []
+    return [v for v in (part.strip().lower() for part in _SPLIT_RE.split(cell)) if v]
+
+
+def meta_path(path):
+    return f"{os.path.splitext(path)[0]}.json"
+
+
+class FacetIndex:
+    """Value bitmaps per column; ``mask(filters)`` turns a filter into a row mask."""
+
+    def __init__(self, facets, rows):
+        # facets: column -> (values, packed bitmaps of shape (len(values), ceil(rows / 8)))
+        self.facets = facets
+        self.rows = rows
+        self._lookup = {col: {v: i for i, v in enumerate(values)} for col, (values, _) in facets.items()}
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def columns(self):
+        return list(self.facets)
+
+    def values(self, column):
+        return list(self.facets[column][0])
+
+    def mask(self, filters):
+        """Boolean row mask for ``filters`` (None or empty means no restriction)."""
+        if not filters:
+            return None
+        packed = None
+        for column, wanted in filters.items():
+            if column not in self.facets:
+                raise ValueError(f"Cannot filter on {column!r}; filterable columns: {', '.join(self.columns)}.")
+            if isinstance(wanted, str):
+                wanted = [wanted]
+            _, bitmaps = self.facets[column]
+            lookup = self._lookup[column]
+            wanted = [str(w).strip().lower() for w in wanted]
+            unknown = [w for w in wanted if w not in lookup]
+            if unknown:
+                known = sorted(self.values(column))
+                listed = ", ".join(known[:MAX_LISTED_VALUES]) + (", ..." if len(known) > MAX_LISTED_VALUES else "")
+                raise ValueError(f"Unknown {column!r} value(s) {', '.join(map(repr, unknown))}; known values: {listed}.")
+            hits = [lookup[v] for v in wanted]
+            column_bits = np.bitwise_or.reduce(bitmaps[hits], axis=0) if hits \
+                else np.zeros(bitmaps.shape[1], dtype=np.uint8)
+            packed = column_bits if packed is None else packed & column_bits
+        return np.unpackbits(packed, count=self.rows, bitorder="little").astype(bool)
+
+    def save(self, path):
+        arrays = {f"f{i}": bitmaps for i, (_, bitmaps) in enumerate(self.facets.values())}
+        meta = {"rows": self.rows, "columns": [[col, values] for col, (values, _) in self.facets.items()]}
+        tmp_path = f"{path}.tmp.npz"  # np.savez appends .npz otherwise
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        tmp_meta = f"{meta_path(path)}.tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_meta, meta_path(path))
+
+    @classmethod
+    def load(cls, path):
+        with open(meta_path(path), encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(path) as arrays:
+            facets = {col: (values, arrays[f"f{i}"]) for i, (col, values) in enumerate(meta["columns"])}
+        return cls(facets, meta["rows"])
+
+
+def facet_columns(df, max_values=MAX_FACET_VALUES):
+    """``FACET_COLUMNS`` in ``df`` plus every other low-cardinality text column."""
+    columns = [c for c in FACET_COLUMNS if c in df.columns]
+    for column in df.columns:
+        if column in columns or column in NON_FACET_COLUMNS or df[column].dtype != object:
+            continue
+        values = set()
+        for cell in df[column].tolist():
+            values.update(split_values(cell))
+            if len(values) > max_values:
+                break
+        else:
+            if values:
+                columns.append(column)
+    return columns
+
+
+def build_facets(df, columns=None):
+    """Bitmaps for each of ``columns`` present in ``df`` (default: ``facet_columns(df)``)."""
+    if columns is None:
+        columns = facet_columns(df)
+    rows = len(df)
+    facets = {}
+    for column in columns:
+        if column not in df.columns:
+            continue
+        vocab, members = {}, []
+        for row, cell in enumerate(df[column].tolist()):
+            for value in set(split_values(cell)):
+                members.append((vocab.setdefault(value, len(vocab)), row))
+        packed = np.zeros((len(vocab), (rows + 7) // 8), dtype=np.uint8)
+        if members:
+            value_ids, row_ids = np.array(members, dtype=np.int64).T
+            # Same layout as np.packbits(..., bitorder="little"), without a dense bool matrix
+            np.bitwise_or.at(packed, (value_ids, row_ids >> 3), (1 << (row_ids & 7)).astype(np.uint8))
+        values = sorted(vocab, key=vocab.get)
+        facets[column] = (values, packed)
+    return FacetIndex(facets, rows)
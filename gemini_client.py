@@ -0,0 +1,37 @@
+import os
+import threading
+from typing import Optional
+
+import google.generativeai as genai
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+# One GenerativeModel per (api key, model name), shared by every thread and
+# Streamlit session in this process
+_lock = threading.Lock()
+_configured_key: Optional[str] = None
+_models = {}
+
+
+def resolve_model_name(model_name: Optional[str] = None) -> str:
+    return (model_name or os.getenv("LLM_MODEL", DEFAULT_MODEL)).strip()
+
+
+def get_gemini_model(model_name: Optional[str] = None):
+    """Return the shared Gemini model handle, configuring the SDK at most once per key."""
+    global _configured_key
+    api_key = os.getenv("GEMINI_API_KEY", "").strip()
+    if not api_key:
+        print("❌ GEMINI_API_KEY not found in .env file.")
+        return None
+    model_name = resolve_model_name(model_name)
+
+    key = (api_key, model_name)
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            if _configured_key != api_key:
+                genai.configure(api_key=api_key)
+                _configured_key = api_key
+            model = _models[key] = genai.GenerativeModel(model_name)
+    return model
@@ -0,0 +1,153 @@
+"""Visible-text extraction from homepages without building a full parse tree.
+
+Both scrapers only keep the first ~2,000 characters of a page's visible text, so
+the extractor streams the HTML through an event parser and stops as soon as it
+has collected ``limit`` characters. It uses lxml's C parser when lxml is
+installed and falls back to the stdlib ``html.parser``. The output follows the
+previous BeautifulSoup path (``" ".join(soup.stripped_strings)[:limit]`` after
+dropping script/style/noscript); ``benchmarks/bench_html_text.py`` measures
+speed and agreement on a saved HTML corpus.
+"""
+from html.parser import HTMLParser
+from typing import List, Optional
+
+try:
+    from lxml import etree as _lxml_etree
+except ImportError:  # optional speed-up
+    _lxml_etree = None
+
+SKIP_TAGS = frozenset({"script", "style", "noscript"})
+CHUNK_SIZE = 16 * 1024
+
+
+class _Enough(Exception):
+    pass
+
+
+class _TextCollector:
+    """Parser-agnostic sink: start/end/data events in, stripped strings out."""
+
+    def __init__(self, limit: Optional[int]) -> None:
+        self.limit = limit
+        self.parts: List[str] = []
+        self.length = 0
+        self.done = False
+        self._skip_depth = 0
+        self._buffer: List[str] = []
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        text = "".join(self._buffer).strip()
+        self._buffer = []
+        if text:
+            self.parts.append(text)
+            self.length += len(text) + 1
+            if self.limit is not None and self.length > self.limit:
+                self.done = True
+
+    # Each tag boundary ends a string, as in BeautifulSoup's tree
+    def start(self, tag, attrib=None) -> None:
+        self._flush()
+        if str(tag).lower() in SKIP_TAGS:
+            self._skip_depth += 1
+
+    def end(self, tag) -> None:
+        self._flush()
+        if str(tag).lower() in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def data(self, data) -> None:
+        if not self._skip_depth:
+            self._buffer.append(data)
+
+    def close(self) -> str:
+        self._flush()
+        text = " ".join(self.parts)
+        return text[:self.limit] if self.limit is not None else text
+
+
+class _StdlibParser(HTMLParser):
+    def __init__(self, collector: _TextCollector) -> None:
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag)
+        self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+class _LxmlTarget(_TextCollector):
+    # lxml parser-target interface; raising stops the C parser mid-document
+    def start(self, tag, attrib=None) -> None:
+        super().start(tag, attrib)
+        if self.done:
+            raise _Enough
+
+
+def _extract_stdlib(html: str, limit: Optional[int]) -> str:
+    collector = _TextCollector(limit)
+    parser = _StdlibParser(collector)
+    for i in range(0, len(html), CHUNK_SIZE):
+        parser.feed(html[i:i + CHUNK_SIZE])
+        if collector.done:
+            return collector.close()
+    parser.close()
+    return collector.close()
+
+
+def _extract_lxml(html: str, limit: Optional[int]) -> str:
+    target = _LxmlTarget(limit)
+    parser = _lxml_etree.HTMLParser(target=target, no_network=True, recover=True)
+    try:
+        for i in range(0, len(html), CHUNK_SIZE):
+            parser.feed(html[i:i + CHUNK_SIZE])
+            if target.done:
+                return target.close()
+        parser.close()
+    except _Enough:
+        pass
+    except _lxml_etree.LxmlError:
+        # libxml2 gave up on badly broken markup; fall back to the stdlib parser
+        return _extract_stdlib(html, limit)
+    return target.close()
+
+
+def _extract_bs4(html: str, limit: Optional[int]) -> str:
+    # Reference implementation (the original scraper code), kept for benchmarks
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(list(SKIP_TAGS)):
+        tag.decompose()
+    text = " ".join(soup.stripped_strings)
+    return text[:limit] if limit is not None else text
+
+
+BACKENDS = {
+    "html.parser": _extract_stdlib,
+    "lxml": _extract_lxml,
+    "bs4": _extract_bs4,
+}
+
+
+def available_backends() -> List[str]:
+    return [name for name in BACKENDS if name != "lxml" or _lxml_etree is not None]
+
+
+def extract_visible_text(html: str, limit: Optional[int] = 2000, backend: str = "auto") -> str:
+    """Return up to ``limit`` characters of visible page text (whitespace-joined strings)."""
+    if not html:
+        return ""
+    if backend == "auto":
+        backend = "lxml" if _lxml_etree is not None else "html.parser"
+    return BACKENDS[backend](html, limit)
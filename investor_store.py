@@ -0,0 +1,88 @@
+"""Compact, memory-mapped investor records for the matcher.
+
+The matcher only ever returns a handful of columns (name, website, email,
+thesis) for the top-k hits. ``p_2_vectorization_preprocessing.py`` writes just
+those columns plus ``investor_id`` to an uncompressed Arrow IPC file; opening it
+with ``pyarrow.memory_map`` maps the columns without reading them, and each
+query copies out only its hit rows. Pages are shared between processes by the
+OS, so extra workers add almost no resident memory.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+STORE_PATH = "investor_store.arrow"
+
+
+def write_store(df, columns, path=STORE_PATH):
+    """Write ``columns`` of ``df`` (in row order) to an Arrow IPC file at ``path``."""
+    table = pa.Table.from_pandas(df[list(columns)], preserve_index=False)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+class InvestorStore:
+    """Read-only investor records addressed by row position."""
+
+    def __init__(self, table):
+        self.table = table
+
+    @classmethod
+    def open(cls, path=STORE_PATH):
+        # Zero-copy: column buffers point into the mapped file
+        return cls(pa.ipc.open_file(pa.memory_map(path, "r")).read_all())
+
+    @property
+    def columns(self):
+        return self.table.column_names
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def ids(self):
+        if "investor_id" not in self.columns:
+            return None
+        return self.table.column("investor_id").to_numpy()
+
+    def take(self, positions, columns):
+        """Rows at ``positions`` as a DataFrame indexed by those positions."""
+        positions = np.asarray(positions, dtype="int64")
+        rows = self.table.select(list(columns)).take(pa.array(positions))
+        return rows.to_pandas().set_axis(positions, axis=0)
+
+    def to_pandas(self):
+        return self.table.to_pandas()
+
+
+class FrameStore:
+    """The same interface over an in-memory DataFrame (the ``investor_data.pkl`` fallback)."""
+
+    def __init__(self, df):
+        self.df = df
+
+    @property
+    def columns(self):
+        return list(self.df.columns)
+
+    def __len__(self):
+        return len(self.df)
+
+    def ids(self):
+        if "investor_id" not in self.df.columns:
+            return None
+        return self.df["investor_id"].to_numpy()
+
+    def take(self, positions, columns):
+        positions = np.asarray(positions, dtype="int64")
+        return pd.DataFrame(
+            {col: self.df[col].to_numpy()[positions] for col in columns},
+            index=self.df.index[positions],
+        )
+
+    def to_pandas(self):
+        return self.df
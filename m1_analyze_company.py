@@ -1,46 +1,81 @@
 # analyze_company_gemini.py
+import hashlib
+import json
 import os
-import cloudscraper
-from bs4 import BeautifulSoup
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
 from dotenv import load_dotenv
-import google.generativeai as genai
 
+from gemini_client import get_gemini_model
+from html_text import extract_visible_text
+from sqlite_cache import SQLiteCache, cache_path
+from web_fetcher import get_fetcher
+
+_analysis_cache = None
+_analysis_cache_lock = threading.Lock()
+
+
+def _get_analysis_cache():
+    """Shared on-disk cache of Gemini analyses; ANALYSIS_CACHE_TTL=0 disables it."""
+    global _analysis_cache
+    ttl = float(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600)))
+    if ttl <= 0:
+        return None
+    with _analysis_cache_lock:
+        if _analysis_cache is None:
+            _analysis_cache = SQLiteCache(
+                os.getenv("ANALYSIS_CACHE_PATH", cache_path("analysis.sqlite3")),
+                ttl_seconds=ttl,
+                max_bytes=int(float(os.getenv("ANALYSIS_CACHE_MAX_MB", "50")) * 1024 * 1024),
+            )
+    return _analysis_cache
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used for cache keys: lowercase scheme/host, no default port, fragment or trailing slash."""
+    parts = urlsplit((url or "").strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip("/")
+    return urlunsplit((scheme, host, path, parts.query, ""))
 
-def analyze_company(company_name: str = None, company_website: str = None):
+
+def _analysis_cache_key(company_name: str, company_website: str, text: str, model) -> str:
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    model_name = getattr(model, "model_name", "") or ""
+    raw = json.dumps([normalize_url(company_website), text_hash, model_name, company_name.strip()])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def analyze_company(company_name: str = None, company_website: str = None, model=None, use_cache: bool = True):
     # Load environment variables
     load_dotenv()
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
-    MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")  # default model
 
-    if not GEMINI_API_KEY:
-        print("❌ GEMINI_API_KEY not found in .env file.")
+    # Reuse the process-wide Gemini handle unless the caller injects one
+    if model is None:
+        model = get_gemini_model()
+    if model is None:
         return None
 
-    # Configure Gemini API
-    genai.configure(api_key=GEMINI_API_KEY)
-
     # Step 1: Get inputs (CLI fallback)
     if not company_name:
         company_name = input("Enter Company Name: ")
     if not company_website:
         company_website = input("Enter Company Website (with https://): ")
 
-    # Step 2: Scrape homepage
-    scraper = cloudscraper.create_scraper()
+    # Step 2: Scrape homepage (shared sessions + page cache)
     try:
-        response = scraper.get(company_website, timeout=15)
-        response.raise_for_status()
+        html = get_fetcher().fetch_text(company_website)
     except Exception as e:
         print(f"Error fetching website: {e}")
         return None
 
-    # Step 3: Extract visible text
-    soup = BeautifulSoup(response.text, "html.parser")
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
-
-    text = " ".join(soup.stripped_strings)
-    text = text[:1500]
+    # Step 3: Extract visible text (stops parsing once 1,500 chars are collected)
+    text = extract_visible_text(html, limit=1500)
 
     # Step 4: Prepare prompt
     prompt = f"""
@@ -51,12 +86,22 @@ def analyze_company(company_name: str = None, company_website: str = None):
     {text}
     """
 
+    # Same site text, company and model as a recent run: skip the LLM call
+    cache = _get_analysis_cache() if use_cache else None
+    cache_key = _analysis_cache_key(company_name, company_website, text, model) if cache is not None else None
+    if cache is not None:
+        cached = cache.get_json(cache_key)
+        if cached:
+            return cached
+
     # Step 5: Call Gemini API
     try:
-        model = genai.GenerativeModel(MODEL)
         gemini_response = model.generate_content(prompt)
     except Exception as e:
         print(f"Error calling Gemini API: {e}")
         return None
 
-    return gemini_response.text.strip()
+    summary = gemini_response.text.strip()
+    if cache is not None and summary:
+        cache.set_json(cache_key, summary)
+    return summary
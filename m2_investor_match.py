@@ -1,6 +1,9 @@
+import json
+import os
+import threading
+
+import numpy as np
 import pandas as pd
-import faiss
-from sentence_transformers import SentenceTransformer
 
 MODEL_NAME = "sentence-transformers/all-distilroberta-v1"
 PREFERRED_EMAIL_COLUMNS = [
@@ -11,40 +14,519 @@ PREFERRED_EMAIL_COLUMNS = [
     "Contact Email",
 ]
 
-# Load model, FAISS index, and investor data once
-print("🔄 Loading model & data...")
-model = SentenceTransformer(MODEL_NAME)
-df = pd.read_pickle("investor_data.pkl")
-index = faiss.read_index("investor_index.faiss")
-
-def find_matching_investors(summary, top_k=5):
-    # Encode query
-    summary_emb = model.encode([summary]).astype("float32")
-    faiss.normalize_L2(summary_emb)  # cosine similarity
+DATA_PATH = "investor_data.pkl"
+INDEX_PATH = "investor_index.faiss"
+STORE_PATH = "investor_store.arrow"
+EMBEDDINGS_PATH = "investor_embeddings.npy"
+BM25_PATH = "investor_bm25.npz"
+FACETS_PATH = "investor_facets.npz"
 
-    # Search in FAISS
-    distances, indices = index.search(summary_emb, top_k)
+MATCH_MODES = ("dense", "hybrid")
+FUSION_METHODS = ("rrf", "weighted")
+RRF_K = 60
+# Filters matching at most this many investors skip FAISS and are scored exactly
+EXACT_FILTER_ROWS = 20000
 
-    # Prepare results
-    results = df.iloc[indices[0]].copy()
-    results["similarity"] = distances[0]
 
+def _result_columns(columns):
     # Build a robust set of return columns
     desired_columns = ['Investor name', 'Website']
     # Try to include an email column if present
     for col in PREFERRED_EMAIL_COLUMNS:
-        if col in results.columns:
+        if col in columns:
             desired_columns.append(col)
             break
     # Optionally include thesis for better personalization downstream
-    if 'Final Investment thesis' in results.columns:
+    if 'Final Investment thesis' in columns:
         desired_columns.append('Final Investment thesis')
-    desired_columns.append('similarity')
-
     # Filter to existing columns only (defensive against schema drift)
-    desired_columns = [c for c in desired_columns if c in results.columns]
-    return results[desired_columns]
-    
+    return [c for c in desired_columns if c in columns]
+
+
+def write_investor_store(df, path=STORE_PATH):
+    """Save the columns the matcher returns (plus ``investor_id``) as a memory-mappable store."""
+    from investor_store import write_store
+
+    columns = (["investor_id"] if "investor_id" in df.columns else []) + _result_columns(df.columns)
+    write_store(df, columns, path)
+
+
+def manifest_path(index_path=INDEX_PATH):
+    return f"{os.path.splitext(index_path)[0]}.manifest.json"
+
+
+def read_build_manifest(index_path=INDEX_PATH):
+    """The manifest p_2 writes next to the index (None for builds that predate it)."""
+    try:
+        with open(manifest_path(index_path), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def validate_build(manifest, model_name, index, rows):
+    """Refuse to query an index with vectors from a different model or dimension."""
+    if manifest.get("model_name") != model_name:
+        raise ValueError(
+            f"The index was built with {manifest.get('model_name')!r} but the matcher uses {model_name!r}; "
+            "rebuild it with p_2_vectorization_preprocessing.py."
+        )
+    if manifest.get("dimension") not in (None, index.d):
+        raise ValueError(f"Index dimension {index.d} does not match the manifest ({manifest['dimension']}).")
+    if manifest.get("rows") != rows or index.ntotal != rows:
+        # Tolerated (e.g. mid-rebuild): unknown ids are dropped from results
+        print(f"⚠️ Index has {index.ntotal} vectors, manifest {manifest.get('rows')}, store {rows} rows.")
+
+
+def fuse_rankings(dense_rows, dense_scores, lexical_rows, lexical_scores, method="rrf", alpha=0.5):
+    """Merge two best-first candidate lists into one ``(rows, scores)`` ranking.
+
+    ``rrf`` sums ``1 / (RRF_K + rank)`` per list; ``weighted`` sums min-max
+    normalized scores. Either way the dense list is weighted by ``alpha`` and
+    the lexical one by ``1 - alpha``; a row missing from a list gets 0 from it.
+    """
+    rows = np.union1d(dense_rows, lexical_rows)
+    fused = np.zeros(len(rows), dtype="float32")
+    lists = ((dense_rows, dense_scores, alpha), (lexical_rows, lexical_scores, 1 - alpha))
+    for list_rows, list_scores, weight in lists:
+        if not len(list_rows):
+            continue
+        if method == "rrf":
+            values = 1.0 / (RRF_K + np.arange(1, len(list_rows) + 1))
+        else:
+            low, high = float(np.min(list_scores)), float(np.max(list_scores))
+            values = (list_scores - low) / (high - low) if high > low else np.ones(len(list_rows))
+        fused[np.searchsorted(rows, list_rows)] += weight * values
+    order = np.argsort(-fused, kind="stable")
+    return rows[order], fused[order]
+
+
+def _env_int(name):
+    raw = os.getenv(name, "").strip()
+    return int(raw) if raw.isdigit() and int(raw) > 0 else None
+
+
+def search_params(index, nprobe=None, ef_search=None, sel=None):
+    """Per-query FAISS search parameters (None when there is nothing to set).
+
+    ``nprobe`` applies to IVF indexes and ``ef_search`` to HNSW; unset values
+    fall back to the ``FAISS_NPROBE`` / ``FAISS_EF_SEARCH`` environment variables.
+    ``sel`` is an ``IDSelector`` restricting the search to some investors.
+    Passing them per query (rather than mutating the index) keeps concurrent
+    searches with different settings safe.
+    """
+    import faiss
+
+    inner = index
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        inner = faiss.downcast_index(index.index)
+    options = {"sel": sel} if sel is not None else {}
+    if faiss.try_extract_index_ivf(inner) is not None:
+        nprobe = nprobe or _env_int("FAISS_NPROBE")
+        if nprobe:
+            options["nprobe"] = nprobe
+        return faiss.SearchParametersIVF(**options) if options else None
+    if hasattr(inner, "hnsw"):
+        ef_search = ef_search or _env_int("FAISS_EF_SEARCH")
+        if ef_search:
+            options["efSearch"] = ef_search
+        return faiss.SearchParametersHNSW(**options) if options else None
+    return faiss.SearchParameters(**options) if options else None
+
+
+class InvestorMatcher:
+    """Semantic matcher over the investor FAISS index.
+
+    Nothing is loaded on construction: the investor records and the index are
+    read on first use (or by an explicit ``warmup()``), exactly once even when
+    several threads query at the same time. The SentenceTransformer model is
+    loaded separately, only when a query misses the query embedding cache, on
+    the ``EMBEDDING_BACKEND`` chosen in ``embedding_backend``.
+
+    Investor records come from the memory-mapped store at ``store_path`` when
+    it exists, so only the hit rows of each query are materialized; older
+    builds without one fall back to loading the full ``investor_data.pkl``.
+
+    When the build includes a BM25 index (``bm25_path``) matching defaults to
+    ``hybrid``: dense and lexical candidates are fused (see ``fuse_rankings``)
+    so theses naming a summary's specific terms verbatim are not missed.
+    ``MATCH_MODE``, ``MATCH_FUSION`` and ``MATCH_ALPHA`` set the defaults.
+    """
+
+    def __init__(self, model_name=MODEL_NAME, data_path=DATA_PATH, index_path=INDEX_PATH, store_path=STORE_PATH,
+                 query_cache=None, backend=None, bm25_path=BM25_PATH, embeddings_path=EMBEDDINGS_PATH,
+                 facets_path=FACETS_PATH):
+        from embedding_backend import embedding_key, resolve_backend
+        from embedding_cache import query_cache_from_env
+
+        self.model_name = model_name
+        self.backend = resolve_backend(backend)
+        self.embedding_key = embedding_key(model_name, self.backend)
+        self.data_path = data_path
+        self.index_path = index_path
+        self.store_path = store_path
+        self.bm25_path = bm25_path
+        self.embeddings_path = embeddings_path
+        self.facets_path = facets_path
+        self.query_cache = query_cache if query_cache is not None else query_cache_from_env()
+        self._lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        self._model = None
+        self._store = None
+        self._index = None
+        self._id_positions = None
+        self._lexical = None
+        self._embeddings = None
+        self._facets = None
+        self._ids = None
+        self.manifest = None
+
+    @property
+    def loaded(self):
+        return self._index is not None
+
+    def warmup(self):
+        """Load everything now instead of on the first query."""
+        self._ensure_loaded()
+        self._ensure_model()
+        return self
+
+    def _ensure_loaded(self):
+        if self._index is not None:
+            return
+        with self._lock:
+            if self._index is not None:
+                return
+            import faiss
+
+            print("🔄 Loading investor data...")
+            store = self._open_store()
+            index = faiss.read_index(self.index_path)
+            manifest = read_build_manifest(self.index_path)
+            if manifest is not None:
+                validate_build(manifest, self.model_name, index, len(store))
+            self.manifest = manifest
+            self._store = store
+            self._lexical = self._open_optional(self.bm25_path, self._load_bm25, len(store))
+            self._embeddings = self._open_optional(
+                self.embeddings_path, lambda p: np.load(p, mmap_mode="r"), len(store)
+            )
+            self._facets = self._open_optional(self.facets_path, self._load_facets, len(store))
+            # Indexes built by p_2 are ID-mapped: FAISS returns investor ids, not row numbers
+            ids = store.ids()
+            if ids is not None:
+                self._ids = ids
+                self._id_positions = pd.Index(ids)
+            # Published last: a non-None index means the rest is ready
+            self._index = index
+
+    def _ensure_model(self):
+        if self._model is not None:
+            return self._model
+        self._ensure_loaded()
+        with self._model_lock:
+            if self._model is None:
+                from embedding_backend import load_embedder
+
+                print(f"🔄 Loading embedding model ({self.backend})...")
+                model = load_embedder(self.model_name, self.backend)
+                dimension = model.get_sentence_embedding_dimension()
+                if dimension != self._index.d:
+                    raise ValueError(
+                        f"{self.model_name} makes {dimension}-d vectors; the index holds {self._index.d}-d."
+                    )
+                self._model = model
+        return self._model
+
+    def embed(self, texts):
+        """Normalized query embeddings for ``texts``; only cache misses are encoded."""
+        import faiss
+
+        texts = list(texts)
+        cache = self.query_cache
+        keys = [cache.key(self.embedding_key, t) for t in texts] if cache is not None else []
+        vectors = [cache.get(k) for k in keys] if cache is not None else [None] * len(texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            encoded = np.asarray(self._ensure_model().encode([texts[i] for i in missing]), dtype="float32")
+            faiss.normalize_L2(encoded)  # cosine similarity
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+                if cache is not None:
+                    cache.put(keys[i], vector)
+        return np.vstack(vectors).astype("float32", copy=False)
+
+    @staticmethod
+    def _load_bm25(path):
+        from bm25_index import BM25Index
+
+        return BM25Index.load(path)
+
+    @staticmethod
+    def _load_facets(path):
+        from facet_filter import FacetIndex
+
+        return FacetIndex.load(path)
+
+    def _facet_index(self):
+        if self._facets is None:
+            # Builds without investor_facets.npz: derive the bitmaps from the pickle once
+            from facet_filter import build_facets
+
+            with self._lock:
+                if self._facets is None:
+                    self._facets = build_facets(pd.read_pickle(self.data_path))
+        return self._facets
+
+    def filter_mask(self, filters):
+        """Row mask for ``filters`` (see ``facet_filter``), or None for no filter."""
+        if not filters:
+            return None
+        self._ensure_loaded()
+        return self._facet_index().mask(filters)
+
+    def _selector(self, mask):
+        # Restricts FAISS to the masked rows. ID-mapped indexes see investor ids,
+        # so positions are translated; the smaller side of the mask is enumerated.
+        import faiss
+
+        if self._ids is None:
+            bitmap = np.packbits(mask, bitorder="little")
+            return faiss.IDSelectorBitmap(bitmap), bitmap
+        if mask.sum() <= len(mask) // 2:
+            return faiss.IDSelectorBatch(self._ids[mask]), None
+        excluded = faiss.IDSelectorBatch(self._ids[~mask])
+        return faiss.IDSelectorNot(excluded), excluded
+
+    def _exact_search(self, queries, mask, k):
+        # Brute force over the stored vectors of the masked rows; returns
+        # (scores, positions) shaped like a FAISS search, padded with -1
+        rows = np.flatnonzero(mask)
+        scores = queries @ np.asarray(self._embeddings[rows], dtype="float32").T
+        distances = np.full((len(queries), k), -np.inf, dtype="float32")
+        positions = np.full((len(queries), k), -1, dtype="int64")
+        hits = min(k, len(rows))
+        if hits:
+            top = np.argpartition(-scores, hits - 1, axis=1)[:, :hits]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            positions[:, :hits] = rows[np.take_along_axis(top, order, axis=1)]
+            distances[:, :hits] = np.take_along_axis(top_scores, order, axis=1)
+        return distances, positions
+
+    @staticmethod
+    def _open_optional(path, load, rows):
+        # Extras from p_2 are only used when they line up with the investor store
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            value = load(path)
+        except (OSError, ValueError, ImportError) as e:
+            print(f"⚠️ Ignoring {path}: {e}")
+            return None
+        if len(value) != rows:
+            print(f"⚠️ Ignoring {path}: {len(value)} rows, investor store has {rows}.")
+            return None
+        return value
+
+    def _open_store(self):
+        from investor_store import FrameStore, InvestorStore
+
+        if self.store_path and os.path.exists(self.store_path):
+            return InvestorStore.open(self.store_path)
+        return FrameStore(pd.read_pickle(self.data_path))
+
+    @property
+    def model(self):
+        return self._ensure_model()
+
+    @property
+    def df(self):
+        # Materializes every stored row; queries never need this
+        self._ensure_loaded()
+        return self._store.to_pandas()
+
+    @property
+    def index(self):
+        self._ensure_loaded()
+        return self._index
+
+    def find_batch(self, summaries, top_k=5, nprobe=None, ef_search=None, mode=None, fusion=None, alpha=None,
+                   candidates=None, filters=None, rerank=None, diversity=None):
+        """Match many company summaries at once.
+
+        Summaries already in the query embedding cache skip the model; the rest
+        are encoded in a single ``model.encode`` call. All of them are searched
+        with one FAISS query over the whole matrix. The hit rows for every query
+        are gathered once, column by column, and returned as one DataFrame per
+        summary (row slices of that single gather, in input order).
+        ``nprobe``/``ef_search`` trade recall for speed on IVF/HNSW indexes.
+
+        ``mode="hybrid"`` also runs BM25 over the theses and fuses the top
+        ``candidates`` of both retrievers with ``fusion`` (``rrf`` or
+        ``weighted``, dense weight ``alpha``); the frame then gets a ``score``
+        column with the fused score, while ``similarity`` stays the cosine.
+
+        ``filters`` (e.g. ``{"Stage of investment": ["2. Prototype"], "Global HQ": "Germany"}``)
+        restricts both retrievers to matching investors during the search, via
+        precomputed attribute bitmaps, so filtered queries still return ``top_k``
+        rows whenever enough investors match. With stored investor vectors, filters
+        matching at most ``MATCH_EXACT_FILTER_ROWS`` (default 20000) investors are
+        scored exactly against those rows; broader filters go through FAISS and
+        fall back to exact scoring when an HNSW/IVF walk comes back short.
+
+        ``rerank="mmr"`` or ``"dedup"`` re-ranks an over-fetched pool of
+        ``candidates`` with the stored investor vectors (see ``rerank``) so
+        near-identical sister funds don't take several of the ``top_k`` slots;
+        ``diversity`` sets the MMR relevance/novelty trade-off.
+        """
+        summaries = list(summaries)
+        if not summaries:
+            return []
+        self._ensure_loaded()
+        store = self._store
+        mode = self._resolve_mode(mode)
+        fusion = fusion or os.getenv("MATCH_FUSION", "rrf")
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion {fusion!r}; choose one of {', '.join(FUSION_METHODS)}.")
+        alpha = float(os.getenv("MATCH_ALPHA", "0.5")) if alpha is None else alpha
+
+        # Encode queries (cached per summary text)
+        summary_embs = self.embed(summaries)
+
+        mask = self.filter_mask(filters)
+        matching = int(mask.sum()) if mask is not None else None
+        exact = matching is not None and self._embeddings is not None
+
+        # Search in FAISS
+        rerank = self._resolve_rerank(rerank)
+        plain = mode == "dense" and rerank is None
+        fetch_k = top_k if plain else max(top_k, candidates or _env_int("MATCH_CANDIDATES") or 50)
+        if exact and matching <= (_env_int("MATCH_EXACT_FILTER_ROWS") or EXACT_FILTER_ROWS):
+            distances, positions = self._exact_search(summary_embs, mask, fetch_k)
+        else:
+            sel, keep_alive = self._selector(mask) if mask is not None else (None, None)
+            params = search_params(self._index, nprobe=nprobe, ef_search=ef_search, sel=sel)
+            distances, indices = self._index.search(summary_embs, fetch_k, params=params)
+            del keep_alive  # the selector only borrows this during the search
+
+            # FAISS pads with -1 when top_k exceeds the number of indexed investors;
+            # ids missing from the frame (mid-rebuild) also map to -1
+            positions = self._rows_for_labels(indices)
+            if exact and ((positions >= 0).sum(axis=1) < min(fetch_k, matching)).any():
+                # HNSW/IVF walks can end before finding enough matching rows
+                distances, positions = self._exact_search(summary_embs, mask, fetch_k)
+        valid = positions >= 0
+
+        if plain:
+            hits = store.take(positions[valid], _result_columns(store.columns))
+            hits["similarity"] = distances[valid]
+            offsets = np.concatenate(([0], np.cumsum(valid.sum(axis=1))))
+            return [hits.iloc[offsets[i]:offsets[i + 1]] for i in range(len(summaries))]
+
+        if rerank is not None:
+            from rerank import rerank as rerank_candidates
+
+            diversity = float(os.getenv("MATCH_DIVERSITY", "0.5")) if diversity is None else diversity
+            threshold = float(os.getenv("MATCH_DEDUP_THRESHOLD", "0.95"))
+
+        ranked = []
+        for i, summary in enumerate(summaries):
+            dense_rows, dense_scores = positions[i][valid[i]], distances[i][valid[i]]
+            rows, scores = dense_rows, dense_scores
+            if mode == "hybrid":
+                lexical_scores = self._lexical.scores(summary)
+                if mask is not None:
+                    lexical_scores[~mask] = 0
+                lexical_rows, lexical_scores = self._lexical.search(summary, fetch_k, scores=lexical_scores)
+                rows, scores = fuse_rankings(dense_rows, dense_scores, lexical_rows, lexical_scores, fusion, alpha)
+            if rerank is not None and len(rows):
+                keep = rerank_candidates(self._embeddings[rows], scores, top_k, rerank, diversity, threshold)
+                rows, scores = rows[keep], scores[keep]
+            rows, scores = rows[:top_k], scores[:top_k]
+            similarity = self._similarity(rows, summary_embs[i], dense_rows, dense_scores)
+            ranked.append((rows.astype("int64"), scores, similarity))
+
+        hits = store.take(np.concatenate([r for r, _, _ in ranked]), _result_columns(store.columns))
+        hits["similarity"] = np.concatenate([sim for _, _, sim in ranked])
+        if mode == "hybrid":
+            hits["score"] = np.concatenate([s for _, s, _ in ranked])
+        offsets = np.concatenate(([0], np.cumsum([len(r) for r, _, _ in ranked])))
+        return [hits.iloc[offsets[i]:offsets[i + 1]] for i in range(len(summaries))]
+
+    def _resolve_rerank(self, rerank):
+        from rerank import RERANK_METHODS
+
+        rerank = rerank if rerank is not None else os.getenv("MATCH_RERANK", "")
+        if rerank in ("", "none", False):
+            return None
+        if rerank not in RERANK_METHODS:
+            raise ValueError(f"Unknown re-ranking {rerank!r}; choose one of {', '.join(RERANK_METHODS)}.")
+        if self._embeddings is None:
+            print(f"⚠️ Re-ranking needs the stored vectors in {self.embeddings_path}; skipped.")
+            return None
+        return rerank
+
+    def _resolve_mode(self, mode):
+        mode = mode or os.getenv("MATCH_MODE") or ("hybrid" if self._lexical is not None else "dense")
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode {mode!r}; choose one of {', '.join(MATCH_MODES)}.")
+        if mode == "hybrid" and self._lexical is None:
+            print(f"⚠️ No BM25 index at {self.bm25_path}; falling back to dense matching.")
+            return "dense"
+        return mode
+
+    def _similarity(self, rows, query, dense_rows, dense_scores):
+        # Cosine for every returned row: exact from the stored vectors, else from
+        # the FAISS hits (NaN for rows only the lexical retriever found)
+        if self._embeddings is not None:
+            return np.asarray(self._embeddings[rows] @ query, dtype="float32")
+        lookup = dict(zip(dense_rows.tolist(), dense_scores.tolist()))
+        return np.array([lookup.get(r, np.nan) for r in rows.tolist()], dtype="float32")
+
+    def _rows_for_labels(self, labels):
+        if self._id_positions is None:
+            return labels
+        positions = self._id_positions.get_indexer(labels.ravel()).reshape(labels.shape)
+        return np.where(labels >= 0, positions, -1)
+
+    def find(self, summary, top_k=5, **search_options):
+        return self.find_batch([summary], top_k=top_k, **search_options)[0]
+
+
+_default_matcher = None
+_default_matcher_lock = threading.Lock()
+
+
+def get_matcher():
+    """Process-wide matcher shared by the CLI, the Streamlit app and scripts."""
+    global _default_matcher
+    if _default_matcher is None:
+        with _default_matcher_lock:
+            if _default_matcher is None:
+                _default_matcher = InvestorMatcher()
+    return _default_matcher
+
+
+def warmup():
+    return get_matcher().warmup()
+
+
+def find_matching_investors_batch(summaries, top_k=5, **search_options):
+    return get_matcher().find_batch(summaries, top_k=top_k, **search_options)
+
+
+def find_matching_investors(summary, top_k=5, **search_options):
+    return get_matcher().find(summary, top_k=top_k, **search_options)
+
+
+def __getattr__(name):
+    # Backwards compatibility for ``from m2_investor_match import model, df, index``;
+    # these now trigger the lazy load instead of happening at import time.
+    if name in ("model", "df", "index"):
+        return getattr(get_matcher(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Example usage
 # if __name__ == "__main__":
@@ -1,26 +1,63 @@
 import os
 import re
+import json
+import hashlib
+import queue
 import smtplib
+import threading
 from email.utils import formataddr
 from email.mime.text import MIMEText
-from typing import Optional, Tuple, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple, Callable, NamedTuple, Iterable, List
 
 import pandas as pd
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from gemini_client import get_gemini_model, resolve_model_name
+from sqlite_cache import SQLiteCache, cache_path
 
 
 load_dotenv()
 
+# Bump whenever the email prompts change so cached drafts are regenerated
+PROMPT_VERSION = "1"
+
+_draft_cache = None
+_draft_cache_lock = threading.Lock()
+
 
-def _configure_gemini() -> Optional[str]:
-    api_key = os.getenv("GEMINI_API_KEY", "").strip()
-    model_name = os.getenv("LLM_MODEL", "gemini-2.0-flash").strip()
-    if not api_key:
-        print("❌ GEMINI_API_KEY not found in .env file.")
+def _get_draft_cache():
+    """Shared on-disk cache of generated drafts; DRAFT_CACHE_TTL=0 disables it."""
+    global _draft_cache
+    ttl = float(os.getenv("DRAFT_CACHE_TTL", str(30 * 24 * 3600)))
+    if ttl <= 0:
         return None
-    genai.configure(api_key=api_key)
-    return model_name
+    with _draft_cache_lock:
+        if _draft_cache is None:
+            _draft_cache = SQLiteCache(
+                os.getenv("DRAFT_CACHE_PATH", cache_path("email_drafts.sqlite3")),
+                ttl_seconds=ttl,
+                max_bytes=int(float(os.getenv("DRAFT_CACHE_MAX_MB", "50")) * 1024 * 1024),
+            )
+    return _draft_cache
+
+
+def _draft_cache_key(company_summary: str, investor_name: str, investor_website: str, investor_thesis: str,
+                     signature: dict, model) -> str:
+    summary_hash = hashlib.sha256((company_summary or "").strip().encode("utf-8")).hexdigest()
+    thesis_hash = hashlib.sha256((investor_thesis or "").strip().encode("utf-8")).hexdigest()
+    # Handles report "models/<name>"; without one, key on the model that would be used
+    model_name = (getattr(model, "model_name", "") or resolve_model_name()).split("/")[-1]
+    raw = json.dumps([
+        PROMPT_VERSION,
+        model_name,
+        summary_hash,
+        investor_name.strip().lower(),
+        investor_website.strip().lower().rstrip("/"),
+        thesis_hash,
+        [(signature.get(field) or "").strip() for field in sorted(signature)],
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
 
 def _extract_subject_body(raw_text: str) -> Tuple[str, str]:
@@ -109,9 +146,11 @@ def generate_personalized_email(
     founder_email: Optional[str] = None,
     founder_phone: Optional[str] = None,
     founder_linkedin: Optional[str] = None,
+    model=None,
 ) -> Tuple[str, str]:
-    model_name = _configure_gemini()
-    if not model_name:
+    if model is None:
+        model = get_gemini_model()
+    if model is None:
         return "", ""
 
     prompt = f"""
@@ -144,7 +183,6 @@ Each line must be on a separate line. Do not combine lines or use commas between
 """
 
     try:
-        model = genai.GenerativeModel(model_name)
         response = model.generate_content(prompt)
         raw = (response.text or "").strip()
         subject, body = _extract_subject_body(raw)
@@ -165,6 +203,117 @@ Each line must be on a separate line. Do not combine lines or use commas between
         return "", ""
 
 
+def _parse_batch_drafts(raw_text: str, count: int) -> List[Optional[str]]:
+    """Raw ``Subject:/Body:`` text per investor from a batched JSON reply (None where missing)."""
+    text = raw_text.strip()
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, flags=re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        items = json.loads(text)
+    except ValueError:
+        return [None] * count
+    if isinstance(items, dict):
+        items = items.get("emails", [])
+    drafts: List[Optional[str]] = [None] * count
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            pos = int(item.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        email = item.get("email")
+        if 0 <= pos < count and isinstance(email, str) and email.strip():
+            drafts[pos] = email
+    return drafts
+
+
+def generate_personalized_emails_batch(
+    company_summary: str,
+    investors: List[dict],
+    founder_name: Optional[str] = None,
+    company_name: Optional[str] = None,
+    founder_email: Optional[str] = None,
+    founder_phone: Optional[str] = None,
+    founder_linkedin: Optional[str] = None,
+    model=None,
+) -> List[Tuple[str, str]]:
+    """Draft emails for several investors with one JSON-mode Gemini request.
+
+    ``investors`` holds ``investor_name``/``investor_website``/``investor_thesis``
+    dicts. The company summary, instructions and signature are sent once instead
+    of once per investor. Drafts come back in input order; any investor whose
+    draft is missing or unparsable (or the whole batch, if the request fails) is
+    drafted again with ``generate_personalized_email``.
+    """
+    if model is None:
+        model = get_gemini_model()
+    if model is None:
+        return [("", "")] * len(investors)
+    signature = {
+        "founder_name": founder_name,
+        "company_name": company_name,
+        "founder_email": founder_email,
+        "founder_phone": founder_phone,
+        "founder_linkedin": founder_linkedin,
+    }
+
+    blocks = "\n\n".join(
+        f"""Investor {i}:
+- Name: {inv.get("investor_name")} (website: {inv.get("investor_website")})
+- Thesis:\n{inv.get("investor_thesis") or "N/A"}"""
+        for i, inv in enumerate(investors, start=1)
+    )
+    prompt = f"""
+You are an expert startup fundraiser. Draft a concise, personalized cold email to EACH investor listed below.
+
+Context about our company (from website analysis):\n{company_summary}
+
+Constraints for every email:
+- Keep it to 120–180 words, 2–3 short paragraphs, no fluff.
+- Tailor one sentence to that investor's thesis or portfolio focus.
+- Clear CTA for a 20–30 minute chat next week.
+- Use a friendly, professional tone.
+- Do not use placeholders like [Company] or [Investor]. Fill with best-guess real content from context.
+- Each email must be written only for its own investor.
+
+Investors:
+{blocks}
+
+Output a JSON array with exactly one object per investor:
+[{{"id": <investor number>, "email": "Subject: <compelling one-line subject>\\n\\nBody:\\n<final email body>"}}]
+
+IMPORTANT: Every email body must end with this signature, formatted EXACTLY as follows with proper line breaks:
+Regards,
+{founder_name or ""}
+{company_name or ""}
+{founder_email or ""}
+{founder_phone or ""}
+{founder_linkedin or ""}
+
+Each line must be on a separate line. Do not combine lines or use commas between signature elements.
+"""
+
+    try:
+        response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+        raw_drafts = _parse_batch_drafts(response.text or "", len(investors))
+    except Exception as e:
+        print(f"❌ Error calling Gemini API for a batch of {len(investors)} emails: {e}")
+        raw_drafts = [None] * len(investors)
+
+    results = []
+    for investor, raw in zip(investors, raw_drafts):
+        subject, body = _extract_subject_body(raw.strip()) if raw else ("", "")
+        if not subject or not body:
+            # Unparsable or missing from the batch reply: draft this one on its own
+            results.append(generate_personalized_email(company_summary, model=model, **investor, **signature))
+            continue
+        body = _fix_signature_formatting(body, *(value or "" for value in signature.values()))
+        results.append((subject, body))
+    return results
+
+
 def _valid_email(addr: str) -> bool:
     if not isinstance(addr, str):
         return False
@@ -229,7 +378,17 @@ def _infer_smtp_host(from_email: str) -> Optional[str]:
     return f"smtp.{domain}"
 
 
-def send_email_smtp(to_email: str, subject: str, body: str) -> bool:
+class SMTPConfig(NamedTuple):
+    host: str
+    port: int
+    username: str
+    password: str
+    from_name: str
+    from_email: str
+    use_tls: bool
+
+
+def _resolve_smtp_config() -> Optional[SMTPConfig]:
     host = _get_env_any([
         "SMTP_HOST", "EMAIL_HOST", "SMTP_SERVER", "MAIL_SERVER"
     ])
@@ -261,27 +420,199 @@ def send_email_smtp(to_email: str, subject: str, body: str) -> bool:
 
     if not host or not from_email:
         print("❌ Missing SMTP_HOST or SMTP_FROM/SMTP_USERNAME in environment.")
-        return False
-    if not _valid_email(to_email):
-        print(f"⚠️ Skipping invalid email: {to_email}")
-        return False
+        return None
+    return SMTPConfig(host, port, username, password, from_name, from_email, use_tls)
 
-    msg = MIMEText(body, "plain", "utf-8")
-    msg["Subject"] = subject
-    msg["From"] = formataddr((from_name, from_email))
-    msg["To"] = to_email
 
+def _smtp_pool_size(default: int = 3) -> int:
+    raw = _get_env_any(["SMTP_POOL_SIZE"], default=str(default))
     try:
-        with smtplib.SMTP(host, port, timeout=30) as server:
-            if use_tls:
+        return max(1, int(raw))
+    except ValueError:
+        return default
+
+
+class SMTPSessionPool:
+    """A small pool of authenticated SMTP connections.
+
+    Config is resolved once; up to ``size`` connections are opened lazily, kept
+    alive between messages and transparently re-established when the server drops
+    them. Pass an explicit ``SMTPConfig`` to point it at a local test server.
+    """
+
+    # Server rejected this message or our credentials; retrying won't help.
+    # (Checked first: every SMTPException is also an OSError.)
+    _REJECTIONS = (
+        smtplib.SMTPRecipientsRefused,
+        smtplib.SMTPSenderRefused,
+        smtplib.SMTPDataError,
+        smtplib.SMTPAuthenticationError,
+    )
+    # The connection itself is unusable; retried on a fresh one only before a
+    # message was handed to the server
+    _CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+
+    def __init__(
+        self,
+        config: Optional[SMTPConfig] = None,
+        size: Optional[int] = None,
+        timeout: float = 30,
+        max_messages_per_connection: int = 100,
+        retries: int = 1,
+    ) -> None:
+        self.config = config or _resolve_smtp_config()
+        self.size = max(1, size if size is not None else _smtp_pool_size())
+        self.timeout = timeout
+        self.max_messages_per_connection = max_messages_per_connection
+        self.retries = max(0, retries)
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle: "queue.LifoQueue[Tuple[smtplib.SMTP, int]]" = queue.LifoQueue()
+        self._closed = False
+
+    def _connect(self) -> smtplib.SMTP:
+        cfg = self.config
+        server = smtplib.SMTP(cfg.host, cfg.port, timeout=self.timeout)
+        try:
+            if cfg.use_tls:
                 server.starttls()
-            if username and password:
-                server.login(username, password)
-            server.sendmail(from_email, [to_email], msg.as_string())
-        return True
-    except Exception as e:
-        print(f"❌ SMTP send failed to {to_email}: {e}")
+            if cfg.username and cfg.password:
+                server.login(cfg.username, cfg.password)
+        except Exception:
+            self._discard(server)
+            raise
+        return server
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _checkout(self) -> Tuple[smtplib.SMTP, int]:
+        # Idle sessions are probed first, so a send never starts on one the server dropped
+        while True:
+            try:
+                server, sent = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect(), 0
+            try:
+                if server.noop()[0] == 250:
+                    return server, sent
+            except self._CONNECTION_ERRORS:
+                pass
+            self._discard(server)
+
+    def _checkin(self, server: smtplib.SMTP, sent: int) -> None:
+        if self._closed or sent >= self.max_messages_per_connection:
+            self._discard(server)
+        else:
+            self._idle.put((server, sent))
+
+    def send(self, to_email: str, subject: str, body: str) -> bool:
+        if self.config is None:
+            return False
+        if not _valid_email(to_email):
+            print(f"⚠️ Skipping invalid email: {to_email}")
+            return False
+
+        cfg = self.config
+        msg = MIMEText(body, "plain", "utf-8")
+        msg["Subject"] = subject
+        msg["From"] = formataddr((cfg.from_name, cfg.from_email))
+        msg["To"] = to_email
+        payload = msg.as_string()
+
+        with self._slots:
+            attempt = 0
+            while True:
+                try:
+                    server, sent = self._checkout()
+                    break
+                except self._REJECTIONS as e:
+                    print(f"❌ SMTP send failed to {to_email}: {e}")
+                    return False
+                except self._CONNECTION_ERRORS as e:
+                    # Nothing was sent yet, so connecting again is safe
+                    if attempt >= self.retries:
+                        print(f"❌ SMTP send failed to {to_email}: {e}")
+                        return False
+                    attempt += 1
+                except Exception as e:
+                    print(f"❌ SMTP send failed to {to_email}: {e}")
+                    return False
+
+            try:
+                server.sendmail(cfg.from_email, [to_email], payload)
+            except self._REJECTIONS as e:
+                # smtplib resets the session after a refusal, so keep it
+                self._checkin(server, sent)
+                print(f"❌ SMTP send failed to {to_email}: {e}")
+                return False
+            except Exception as e:
+                # Never resent: the server may already have accepted the message
+                # (e.g. a timeout waiting for the reply to DATA)
+                self._discard(server)
+                print(f"❌ SMTP send failed to {to_email}: {e}")
+                return False
+            self._checkin(server, sent + 1)
+            return True
+
+    def send_batch(self, messages: Iterable[Tuple[str, str, str]]) -> List[bool]:
+        """Send ``(to_email, subject, body)`` tuples over the pool; results keep input order."""
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="smtp-pool") as pool:
+            return list(pool.map(lambda m: self.send(*m), messages))
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(server)
+
+    def __enter__(self) -> "SMTPSessionPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def send_email_smtp(to_email: str, subject: str, body: str) -> bool:
+    config = _resolve_smtp_config()
+    if config is None:
         return False
+    with SMTPSessionPool(config, size=1, retries=0) as pool:
+        return pool.send(to_email, subject, body)
+
+
+class _EmailJob(NamedTuple):
+    idx: int
+    investor_name: str
+    investor_website: str
+    investor_thesis: str
+    raw_email: str
+    to_email: str
+
+
+def _email_concurrency(default: int = 4) -> int:
+    raw = _get_env_any(["EMAIL_CONCURRENCY", "EMAIL_MAX_WORKERS"], default=str(default))
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        return default
+
+
+def _email_batch_size(default: int = 5) -> int:
+    raw = _get_env_any(["EMAIL_BATCH_SIZE"], default=str(default))
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        return default
 
 
 def send_personalized_emails(
@@ -296,7 +627,32 @@ def send_personalized_emails(
     email_column: Optional[str] = None,
     on_log: Optional[Callable[[str], None]] = None,
     on_progress: Optional[Callable[[int, int], None]] = None,
+    max_workers: Optional[int] = None,
+    model=None,
+    batch_size: Optional[int] = None,
+    use_cache: bool = True,
 ) -> None:
+    """Draft and send one email per row of ``matches_df``.
+
+    Drafts are generated on one thread pool and delivered on another, so Gemini
+    calls for later investors overlap with SMTP sends for earlier ones. Both pools
+    are bounded by ``max_workers`` (default: ``EMAIL_CONCURRENCY`` env, else 4).
+    ``on_log``/``on_progress`` are always invoked from the calling thread, in row
+    order, regardless of which network call finishes first. ``model`` is an
+    optional Gemini handle; by default the process-wide one is used.
+
+    Investors are drafted ``batch_size`` at a time (default: ``EMAIL_BATCH_SIZE``
+    env, else 5) with one JSON-mode Gemini request per batch, so the company
+    summary and instructions are sent once per batch; ``1`` drafts every
+    investor with its own request. Each investor still gets its own send, which
+    starts as soon as its batch is drafted.
+
+    Drafts are cached on disk (see ``_get_draft_cache``) by company summary,
+    investor, signature, ``PROMPT_VERSION`` and model. A dry run always drafts
+    afresh and overwrites the cached drafts, so a real send afterwards delivers
+    exactly the latest reviewed preview without any Gemini call.
+    ``use_cache=False`` neither reads nor writes the cache.
+    """
     def log(message: str) -> None:
         try:
             if on_log is not None:
@@ -304,6 +660,13 @@ def send_personalized_emails(
         finally:
             print(message)
 
+    def progress(done: int, total: int) -> None:
+        if on_progress is not None:
+            try:
+                on_progress(done, total)
+            except Exception:
+                pass
+
     # Identify email column if present
     email_col = None
     if email_column and email_column in matches_df.columns:
@@ -318,50 +681,156 @@ def send_personalized_emails(
         log("⚠️ No email column found in matches; skipping email sending.")
         return
 
+    workers = max_workers if max_workers and max_workers > 0 else _email_concurrency()
+    batch = batch_size if batch_size and batch_size > 0 else _email_batch_size()
+
+    # Signature fields are the same for every investor; resolve them once
+    signature = {
+        "founder_name": founder_name or os.getenv("FOUNDER_NAME"),
+        "company_name": company_name or os.getenv("COMPANY_NAME"),
+        "founder_email": founder_email or _get_env_any(["FOUNDER_EMAIL", "EMAIL_FROM", "SENDER_EMAIL", "SMTP_FROM", "EMAIL"]),
+        "founder_phone": founder_phone or _get_env_any(["FOUNDER_PHONE", "PHONE", "CONTACT_PHONE", "MOBILE", "CONTACT_NUMBER"]),
+        "founder_linkedin": founder_linkedin or _get_env_any(["FOUNDER_LINKEDIN", "LINKEDIN", "LINKEDIN_PROFILE", "FOUNDER_LINKEDIN_URL", "LINKEDIN_URL"]),
+    }
+
+    jobs = []
+    for idx, (_, row) in enumerate(matches_df.iterrows(), start=1):
+        raw_email = str(row.get(email_col, "")).strip()
+        jobs.append(_EmailJob(
+            idx=idx,
+            investor_name=str(row.get("Investor name", "Investor")).strip(),
+            investor_website=str(row.get("Website", "")).strip(),
+            investor_thesis=str(row.get("Final Investment thesis", "")).strip(),
+            raw_email=raw_email,
+            to_email=_sanitize_email(raw_email),
+        ))
+
+    cache = _get_draft_cache() if use_cache else None
+    cache_keys = {
+        job.idx: _draft_cache_key(company_summary, job.investor_name, job.investor_website, job.investor_thesis,
+                                  signature, model)
+        for job in jobs
+    } if cache is not None else {}
+
+    def remember(job: _EmailJob, result: Tuple[str, str]) -> Tuple[str, str]:
+        subject, body = result
+        if cache is not None and subject and body:
+            try:
+                cache.set_json(cache_keys[job.idx], [subject, body])
+            except Exception as e:
+                print(f"⚠️ Could not cache the draft for {job.investor_name}: {e}")
+        return result
+
+    def draft(job: _EmailJob) -> Tuple[str, str]:
+        return remember(job, generate_personalized_email(
+            company_summary=company_summary,
+            investor_name=job.investor_name,
+            investor_website=job.investor_website,
+            investor_thesis=job.investor_thesis or None,
+            model=model,
+            **signature,
+        ))
+
+    def draft_batch(chunk: List[_EmailJob], futures: List[Future]) -> None:
+        # One request for the whole chunk; resolves each investor's own draft future
+        try:
+            results = generate_personalized_emails_batch(
+                company_summary,
+                [{
+                    "investor_name": job.investor_name,
+                    "investor_website": job.investor_website,
+                    "investor_thesis": job.investor_thesis or None,
+                } for job in chunk],
+                model=model,
+                **signature,
+            )
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        for job, future, result in zip(chunk, futures, results):
+            future.set_result(remember(job, result))
+
+    def deliver(job: _EmailJob, draft_future: Future) -> Optional[bool]:
+        # Runs on the send pool; blocks only on this job's own draft
+        subject, body = draft_future.result()
+        if not subject or not body:
+            return None
+        if smtp_pool is None:
+            return False
+        return smtp_pool.send(job.to_email, subject, body)
+
     sent_count = 0
-    total_rows = len(matches_df)
-    
+    total_rows = len(jobs)
+
     # Add dry run header if this is a dry run
     if dry_run:
         log("## 📧 DRY RUN PREVIEW")
         log("Below are the email drafts that would be sent:")
         log("---")
-    
-    for idx, (_, row) in enumerate(matches_df.iterrows(), start=1):
-        if on_progress is not None:
-            try:
-                on_progress(idx - 1, total_rows)
-            except Exception:
-                pass
-        investor_name = str(row.get("Investor name", "Investor")).strip()
-        investor_website = str(row.get("Website", "")).strip()
-        investor_thesis = str(row.get("Final Investment thesis", "")).strip()
-        raw_email = str(row.get(email_col, "")).strip()
-        to_email = _sanitize_email(raw_email)
 
-        if not _valid_email(to_email):
-            log(f"⚠️ Skipping {investor_name}: invalid email '{raw_email}' → sanitized '{to_email}'.")
-            continue
+    # One set of authenticated SMTP sessions is shared by the whole campaign
+    smtp_pool = None
+    if not dry_run:
+        config = _resolve_smtp_config()
+        if config is not None:
+            smtp_pool = SMTPSessionPool(config, size=min(workers, _smtp_pool_size()))
 
-        subject, body = generate_personalized_email(
-            company_summary=company_summary,
-            investor_name=investor_name,
-            investor_website=investor_website,
-            investor_thesis=investor_thesis or None,
-            founder_name=founder_name or os.getenv("FOUNDER_NAME"),
-            company_name=company_name or os.getenv("COMPANY_NAME"),
-            founder_email=founder_email or _get_env_any(["FOUNDER_EMAIL", "EMAIL_FROM", "SENDER_EMAIL", "SMTP_FROM", "EMAIL"]),
-            founder_phone=founder_phone or _get_env_any(["FOUNDER_PHONE", "PHONE", "CONTACT_PHONE", "MOBILE", "CONTACT_NUMBER"]),
-            founder_linkedin=founder_linkedin or _get_env_any(["FOUNDER_LINKEDIN", "LINKEDIN", "LINKEDIN_PROFILE", "FOUNDER_LINKEDIN_URL", "LINKEDIN_URL"]),
-        )
+    draft_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="email-draft")
+    send_pool = ThreadPoolExecutor(max_workers=smtp_pool.size if smtp_pool else 1, thread_name_prefix="email-send")
+    try:
+        drafts = {}
+        sends = {}
+        valid_jobs = [job for job in jobs if _valid_email(job.to_email)]
+        pending = valid_jobs
+        if cache is not None and not dry_run:
+            # The last previewed (or sent) drafts are reused as-is, without the LLM
+            pending = []
+            for job in valid_jobs:
+                cached = cache.get_json(cache_keys[job.idx])
+                if cached:
+                    drafts[job.idx] = Future()
+                    drafts[job.idx].set_result(tuple(cached))
+                else:
+                    pending.append(job)
+            if len(pending) < len(valid_jobs):
+                log(f"♻️ Reusing {len(valid_jobs) - len(pending)} cached draft(s).")
+        if pending and model is None:
+            model = get_gemini_model()
+        for start in range(0, len(pending), batch):
+            chunk = pending[start:start + batch]
+            if len(chunk) == 1:
+                drafts[chunk[0].idx] = draft_pool.submit(draft, chunk[0])
+                continue
+            futures = [Future() for _ in chunk]
+            draft_pool.submit(draft_batch, chunk, futures)
+            drafts.update((job.idx, future) for job, future in zip(chunk, futures))
+        if not dry_run:
+            for job in valid_jobs:
+                sends[job.idx] = send_pool.submit(deliver, job, drafts[job.idx])
+
+        # Consume results in row order so callbacks stay deterministic
+        for job in jobs:
+            progress(job.idx - 1, total_rows)
+            investor_name, to_email = job.investor_name, job.to_email
+
+            if job.idx not in drafts:
+                log(f"⚠️ Skipping {investor_name}: invalid email '{job.raw_email}' → sanitized '{to_email}'.")
+                continue
 
-        if not subject or not body:
-            log(f"⚠️ Skipping {investor_name}: failed to generate email content.")
-            continue
+            try:
+                subject, body = drafts[job.idx].result()
+            except Exception as e:
+                print(f"❌ Error drafting email for {investor_name}: {e}")
+                subject, body = "", ""
 
-        if dry_run:
-            email_preview = f"""
-### Email #{idx}: {investor_name}
+            if not subject or not body:
+                log(f"⚠️ Skipping {investor_name}: failed to generate email content.")
+                continue
+
+            if dry_run:
+                email_preview = f"""
+### Email #{job.idx}: {investor_name}
 
 **To:** {investor_name} <{to_email}>  
 **Subject:** {subject}
@@ -370,22 +839,27 @@ def send_personalized_emails(
 
 ---
             """
-            log(email_preview)
-            continue
+                log(email_preview)
+                continue
 
-        ok = send_email_smtp(to_email, subject, body)
-        if ok:
-            sent_count += 1
-            log(f"✅ Sent to {investor_name} <{to_email}>")
-        else:
-            log(f"❌ Failed to send to {investor_name} <{to_email}> — check SMTP creds, SPF/DKIM, and recipient address.")
+            try:
+                ok = bool(sends[job.idx].result())
+            except Exception as e:
+                print(f"❌ SMTP send failed to {to_email}: {e}")
+                ok = False
+            if ok:
+                sent_count += 1
+                log(f"✅ Sent to {investor_name} <{to_email}>")
+            else:
+                log(f"❌ Failed to send to {investor_name} <{to_email}> — check SMTP creds, SPF/DKIM, and recipient address.")
+    finally:
+        # If a callback aborts the run (e.g. a Streamlit rerun), don't keep sending.
+        # The send pool goes first: running sends may still wait on queued batch drafts.
+        send_pool.shutdown(wait=True, cancel_futures=True)
+        draft_pool.shutdown(wait=True, cancel_futures=True)
+        if smtp_pool is not None:
+            smtp_pool.close()
 
     if not dry_run:
         log(f"\n📨 Done. Sent {sent_count} emails.")
-    if on_progress is not None:
-        try:
-            on_progress(total_rows, total_rows)
-        except Exception:
-            pass
-
-
+    progress(total_rows, total_rows)
@@ -1,12 +1,15 @@
 # main.py
 import os
+import threading
 from dotenv import load_dotenv
 from m1_analyze_company import analyze_company
-from m2_investor_match import find_matching_investors
+from m2_investor_match import find_matching_investors, warmup
 from m3_email_sender import send_personalized_emails
 
 if __name__ == "__main__":
     load_dotenv()
+    # Load the matcher in the background while the user types and Gemini runs
+    threading.Thread(target=warmup, daemon=True).start()
     # Step 1: Get company summary from Gemini, taking company inputs here
     company_name = input("Company name: ").strip()
     company_website = input("Company website (with https://): ").strip()
@@ -0,0 +1,124 @@
+import json
+import os
+from typing import Callable, Iterator, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HOST = "http://localhost:11434"
+
+
+class OllamaError(RuntimeError):
+    pass
+
+
+def _keep_alive_value(value: Union[str, int, float]) -> Union[str, int, float]:
+    # Ollama parses a string keep_alive as a Go duration ("30m", "1h"), which
+    # rejects bare numbers like "-1" or "3600"; send those as seconds instead
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            number = float(value)
+        except ValueError:
+            return value
+        return int(number) if number.is_integer() else number
+    return value
+
+
+def _resolve_host(host: Optional[str]) -> str:
+    host = (host or os.getenv("OLLAMA_HOST") or DEFAULT_HOST).strip().rstrip("/")
+    if not host.startswith(("http://", "https://")):
+        host = f"http://{host}"
+    return host
+
+
+class OllamaClient:
+    """Client for the local Ollama HTTP API over one keep-alive session.
+
+    Connections are pooled (``max_connections`` concurrent requests, thread-safe),
+    the model stays resident for ``keep_alive`` between calls (a duration such as
+    ``"30m"``, or seconds; ``-1`` pins it until the server stops), and ``generate`` can stream tokens as they arrive.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        host: Optional[str] = None,
+        keep_alive: Optional[Union[str, int, float]] = None,
+        timeout: float = 60,
+        connect_timeout: float = 5,
+        max_connections: int = 8,
+        options: Optional[dict] = None,
+    ) -> None:
+        self.model = model
+        self.host = _resolve_host(host)
+        if keep_alive is None:
+            keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "").strip() or "30m"
+        self.keep_alive = _keep_alive_value(keep_alive)
+        self.timeout = (connect_timeout, timeout)
+        self.options = options or {}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _payload(self, prompt: Optional[str], stream: bool, options: dict) -> dict:
+        payload = {"model": self.model, "stream": stream, "keep_alive": self.keep_alive}
+        if prompt is not None:
+            payload["prompt"] = prompt
+        merged = {**self.options, **options}
+        if merged:
+            payload["options"] = merged
+        return payload
+
+    def _post(self, payload: dict, stream: bool, timeout=None) -> requests.Response:
+        response = self.session.post(
+            f"{self.host}/api/generate", json=payload, stream=stream, timeout=timeout or self.timeout
+        )
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("error", response.text)
+            except ValueError:
+                detail = response.text
+            response.close()
+            raise OllamaError(f"Ollama returned {response.status_code}: {detail}")
+        return response
+
+    def load(self, timeout: float = 300) -> None:
+        """Load the model now and keep it resident for ``keep_alive``."""
+        self._post(self._payload(None, False, {}), stream=False, timeout=(self.timeout[0], timeout)).close()
+
+    def stream(self, prompt: str, **options) -> Iterator[str]:
+        """Yield response tokens as Ollama produces them."""
+        with self._post(self._payload(prompt, True, options), stream=True) as response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise OllamaError(chunk["error"])
+                token = chunk.get("response", "")
+                if token:
+                    yield token
+                if chunk.get("done"):
+                    break
+
+    def generate(self, prompt: str, on_token: Optional[Callable[[str], None]] = None, **options) -> str:
+        """Return the full completion; with ``on_token`` it streams and reports each token."""
+        if on_token is not None:
+            parts = []
+            for token in self.stream(prompt, **options):
+                on_token(token)
+                parts.append(token)
+            return "".join(parts).strip()
+        with self._post(self._payload(prompt, False, options), stream=False) as response:
+            return (response.json().get("response") or "").strip()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "OllamaClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
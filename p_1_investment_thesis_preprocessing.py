@@ -1,110 +1,297 @@
+import argparse
 import os
-import cloudscraper
-import requests
-import pandas as pd
-from bs4 import BeautifulSoup
-import subprocess
+import threading
+import time
+
 from dotenv import load_dotenv
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 
+from async_crawler import CrawlStore, crawl_urls
+from enrichment_pipeline import EnrichmentCheckpoint, Stage, run_stages
+from html_text import extract_visible_text
+from ollama_client import OllamaClient
+from sheet_snapshot import load_snapshot, save_snapshot
+from sheet_writer import SheetWriteBuffer
+from web_fetcher import get_fetcher
+
 # --- CONFIG ---
 load_dotenv()
 MODEL = "llama3:8b"  # lightweight model
 SHEET_ID = "1Hof1KGq4opP5UFf1xoRRkmCD9K56iI1XVixNgnR8NWI"
 SHEET_NAME = "Sheet1"  # Change if needed
 SERVICE_ACCOUNT_FILE = "service_account.json"  # Your Google API credentials
+THESIS_COLUMN = "Final Investment thesis"
 
 # -------- Helper: Scrape homepage text --------
 def scrape_homepage(url):
     if not isinstance(url, str) or not url.strip():
         return ""
     try:
-        scraper = cloudscraper.create_scraper()  # Create a cloudscraper session
-        response = scraper.get(url.strip(), timeout=15)
-        response.raise_for_status()
+        html = get_fetcher().fetch_text(url)  # shared per-host sessions + page cache
     except Exception as e:
         print(f"❌ Error fetching {url}: {e}")
         return ""
-    soup = BeautifulSoup(response.text, "html.parser")
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
-    text = " ".join(soup.stripped_strings)
-    return text[:2000]  # limit text length
+    return extract_visible_text(html, limit=2000)  # limit text length
+
+# -------- Helper: Bulk-crawl websites ahead of the LLM --------
+def crawl_websites(websites, **options):
+    """Fetch all ``websites`` concurrently into the crawl store (see async_crawler)."""
+    store = CrawlStore()
+    started = time.monotonic()
+    stats = crawl_urls(websites, store, **options)
+    print(f"🌐 Crawled {stats['ok']} ok, {stats['failed']} failed, {stats['skipped']} already stored "
+          f"in {time.monotonic() - started:.0f}s.")
+    return store
+
+
+def crawled_or_scraped(url, store=None):
+    # Prefer the bulk crawl result; pages it could not fetch get one live attempt
+    if store is not None and isinstance(url, str) and url.strip():
+        entry = store.get(url)
+        if entry is not None and entry.get("text"):
+            return entry["text"]
+    return scrape_homepage(url)
+
 
 # -------- Helper: Call Ollama locally --------
-def ollama_query(prompt):
+_ollama_client = None
+_ollama_client_lock = threading.Lock()
+
+
+def get_ollama_client():
+    # One keep-alive HTTP session shared by every LLM worker thread
+    global _ollama_client
+    with _ollama_client_lock:
+        if _ollama_client is None:
+            _ollama_client = OllamaClient(MODEL)
+    return _ollama_client
+
+
+def ollama_query(prompt, on_token=None):
     try:
-        result = subprocess.run(
-            ["ollama", "run", MODEL],
-            input=prompt.encode("utf-8"),
-            capture_output=True,
-            timeout=60
-        )
-        return result.stdout.decode("utf-8").strip()
+        return get_ollama_client().generate(prompt, on_token=on_token)
     except Exception as e:
         print(f"❌ Ollama error: {e}")
         return ""
 
+# -------- Helper: Summarize one investor with the LLM --------
+def summarize_investor(homepage_text, existing_thesis):
+    if not homepage_text:
+        return f"Website data unavailable. Investment thesis: {existing_thesis}"
+    prompt = f"""
+You are an investment analyst.
+
+From the following homepage text:
+{homepage_text}
+
+1. Identify the main domains or fields this investor is interested in.
+2. Summarize the investment interests clearly and concisely in 3–5 bullet points.
+3. Do not include any introductory phrases like "Based on the homepage text" or "I identify".
+4. Output only the bullet points.
+
+After the bullet points, append this additional thesis information from their dataset:
+"{existing_thesis}"
+"""
+    return ollama_query(prompt)
+
+
+# -------- Helper: Pick rows to (re)process --------
+def select_rows(df, start=None, end=None, only_missing=False):
+    """Row labels in ``df.iloc[start:end]``, optionally only those without a final thesis yet."""
+    subset = df.iloc[start:end]
+    if only_missing and THESIS_COLUMN in subset.columns:
+        subset = subset[subset[THESIS_COLUMN].astype(str).str.strip() == ""]
+    return list(subset.index)
+
+
 # -------- Main processing --------
-def update_google_sheet(sheet_id, sheet_name):
+def update_google_sheet(
+    sheet_id,
+    sheet_name,
+    start=None,
+    end=None,
+    only_missing=False,
+    scrape_workers=8,
+    llm_workers=2,
+    queue_size=32,
+    write_batch_size=50,
+    write_interval=30.0,
+    crawl=False,
+    crawl_only=False,
+    recrawl_after=None,
+    resume=True,
+):
+    """Enrich investors with an LLM-written thesis in a staged pipeline.
+
+    Scraping (``scrape_workers`` threads), summarization (``llm_workers``
+    threads; match ``OLLAMA_NUM_PARALLEL``) and sheet writing run as separate
+    stages joined by bounded queues of ``queue_size`` investors, so each stage
+    runs at its own pace. Results go to a ``SheetWriteBuffer`` that flushes
+    ``write_batch_size`` cells per API call (or every ``write_interval``
+    seconds) within the Sheets quota.
+
+    Every summary is checkpointed locally before it is queued for the sheet. With
+    ``resume=True`` a restarted run skips investors already written and re-sends
+    summaries that were produced but never reached the sheet.
+
+    With ``crawl=True`` every selected website is first fetched by the asyncio
+    bulk crawler and the LLM stage reads pages from its local store;
+    ``crawl_only=True`` only crawls the websites in the local sheet snapshot,
+    without touching the Sheets API. Stored pages are reused until they are
+    ``recrawl_after`` seconds old (None: forever); failed fetches are retried
+    after an hour.
+
+    The rows read from the sheet also refresh that snapshot (see
+    ``sheet_snapshot``), and it is synced again once the run has written results.
+    """
+    if crawl_only:
+        df = load_snapshot()
+        row_ids = select_rows(df, start, end, only_missing)
+        print(f"🧮 Crawling {len(row_ids)} investor websites from the local snapshot.")
+        if "Website" in df.columns:
+            crawl_websites(df.loc[row_ids, "Website"].tolist(), refresh_after=recrawl_after)
+        return
+
     # Auth to Google Sheets
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
     creds = ServiceAccountCredentials.from_json_keyfile_name(SERVICE_ACCOUNT_FILE, scope)
     client = gspread.authorize(creds)
 
     sheet = client.open_by_key(sheet_id).worksheet(sheet_name)
+    source = f"https://docs.google.com/spreadsheets/d/{sheet_id}#{sheet_name}"
 
     # Get all values including empty columns
     all_values = sheet.get_all_values()
     header = all_values[0]
-    data_rows = all_values[1:]
 
     # Find the column index for "Final Investment thesis"
-    if "Final Investment thesis" not in header:
-        header.append("Final Investment thesis")
+    if THESIS_COLUMN not in header:
+        header.append(THESIS_COLUMN)
         sheet.insert_row(header, 1)
         col_index = len(header)  # new column at the end
     else:
-        col_index = header.index("Final Investment thesis") + 1  # 1-based index
+        col_index = header.index(THESIS_COLUMN) + 1  # 1-based index
 
-    # Convert to DataFrame for easy looping
-    df = pd.DataFrame(data_rows, columns=header)
+    # Same frame (and row order) as the local snapshot
+    df, _ = save_snapshot(all_values, source=source)
+    if THESIS_COLUMN not in df.columns:
+        df[THESIS_COLUMN] = ""
 
-    for idx, row in df.iloc[156:250].iterrows():
-        name = row.get("Investor name", "")
-        website = row.get("Website", "")
-        existing_thesis = row.get("Investment thesis", "")
+    row_ids = select_rows(df, start, end, only_missing)
 
-        print(f"\n🔍 Processing {name} ({website})...")
+    def identity(idx):
+        # A checkpoint only applies if the row still holds the same investor
+        return f"{df.at[idx, 'Investor name'] if 'Investor name' in df.columns else ''}|" \
+               f"{df.at[idx, 'Website'] if 'Website' in df.columns else ''}"
 
-        homepage_text = scrape_homepage(website)
+    checkpoint = EnrichmentCheckpoint(f"{sheet_id}/{sheet_name}")
+    writer = SheetWriteBuffer(
+        sheet,
+        flush_size=write_batch_size,
+        flush_interval=write_interval,
+        on_flush=lambda cells: checkpoint.mark_written(row for row, _, _ in cells),
+    )
 
-        if homepage_text:
-            prompt = f"""
-You are an investment analyst.
+    todo, unwritten = [], 0
+    for idx in row_ids:
+        entry = checkpoint.get(idx + 2, identity(idx)) if resume else None
+        if entry is None:
+            todo.append(idx)
+        elif not entry["written"]:
+            writer.add(idx + 2, col_index, entry["summary"])
+            unwritten += 1
+    print(f"🧮 {len(todo)} investors to process"
+          + (f" ({len(row_ids) - len(todo)} already done in a previous run)." if len(todo) < len(row_ids) else "."))
+    if unwritten:
+        print(f"💾 Re-sending {unwritten} checkpointed summaries that never reached the sheet.")
 
-From the following homepage text:
-{homepage_text}
+    crawl_store = None
+    if crawl and "Website" in df.columns:
+        crawl_store = crawl_websites(df.loc[todo, "Website"].tolist(), refresh_after=recrawl_after)
 
-1. Identify the main domains or fields this investor is interested in.
-2. Summarize the investment interests clearly and concisely in 3–5 bullet points.
-3. Do not include any introductory phrases like "Based on the homepage text" or "I identify".
-4. Output only the bullet points.
+    # Load the model once up front and keep it resident for the whole run
+    if todo:
+        try:
+            get_ollama_client().load()
+        except Exception as e:
+            print(f"⚠️ Could not preload {MODEL} in Ollama: {e}")
 
-After the bullet points, append this additional thesis information from their dataset:
-"{existing_thesis}"
-"""
-            summary = ollama_query(prompt)
-        else:
-            summary = f"Website data unavailable. Investment thesis: {existing_thesis}"
+    def scrape(idx, _):
+        return crawled_or_scraped(df.at[idx, "Website"] if "Website" in df.columns else "", crawl_store)
 
-        # Write directly to the correct cell
-        sheet.update_cell(idx + 2, col_index, summary)  # +2 for header
+    def summarize(idx, homepage_text):
+        row = df.loc[idx]
+        print(f"\n🔍 Processing {row.get('Investor name', '')} ({row.get('Website', '')})...")
+        return summarize_investor(homepage_text, row.get("Investment thesis", ""))
 
+    done = 0
+
+    def write(idx, summary):
+        nonlocal done
+        done += 1
+        if not summary:
+            print(f"⚠️ No summary for row {idx + 2}; it will be retried on the next run.")
+            return
+        checkpoint.record(idx + 2, summary, identity(idx))
+        writer.add(idx + 2, col_index, summary)  # +2 for header
+        if done % 10 == 0 or done == len(todo):
+            print(f"📝 {done}/{len(todo)} done ({writer.cells_written} cells saved "
+                  f"in {writer.api_calls} API calls).")
+
+    with writer:
+        run_stages(
+            ((idx, None) for idx in todo),
+            [Stage("scrape", scrape, scrape_workers), Stage("llm", summarize, llm_workers)],
+            write,
+            queue_size=queue_size,
+        )
+
+    if writer.cells_written:
+        save_snapshot(sheet.get_all_values(), source=source)
     print("\n✅ Google Sheet updated successfully!")
 
 
 # -------- Run --------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enrich the investor sheet with LLM-written investment theses.")
+    parser.add_argument("--start", type=int, default=None, help="First data row (0-based, inclusive).")
+    parser.add_argument("--end", type=int, default=None, help="Last data row (0-based, exclusive).")
+    parser.add_argument("--only-missing", action="store_true",
+                        help="Skip investors that already have a final thesis (resume an interrupted run).")
+    parser.add_argument("--scrape-workers", type=int, default=8)
+    parser.add_argument("--llm-workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=32,
+                        help="Investors buffered between the scrape, LLM and write stages.")
+    parser.add_argument("--write-batch-size", type=int, default=50, help="Cells per Sheets batch_update call.")
+    parser.add_argument("--write-interval", type=float, default=30.0,
+                        help="Flush pending cells at least this often (seconds).")
+    parser.add_argument("--crawl", action="store_true",
+                        help="Bulk-crawl all selected websites with the asyncio crawler before the LLM stage.")
+    parser.add_argument("--crawl-only", action="store_true",
+                        help="Only bulk-crawl the websites in the local sheet snapshot into the crawl store.")
+    parser.add_argument("--recrawl-after", type=float, default=None,
+                        help="Re-fetch crawled pages older than this many seconds (default: keep them).")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Ignore the local checkpoint and reprocess every selected investor.")
+    args = parser.parse_args(argv)
+    update_google_sheet(
+        SHEET_ID,
+        SHEET_NAME,
+        start=args.start,
+        end=args.end,
+        only_missing=args.only_missing,
+        scrape_workers=args.scrape_workers,
+        llm_workers=args.llm_workers,
+        queue_size=args.queue_size,
+        write_batch_size=args.write_batch_size,
+        write_interval=args.write_interval,
+        crawl=args.crawl,
+        crawl_only=args.crawl_only,
+        recrawl_after=args.recrawl_after,
+        resume=not args.no_resume,
+    )
+
+
 if __name__ == "__main__":
-    update_google_sheet(SHEET_ID, SHEET_NAME)
+    main()
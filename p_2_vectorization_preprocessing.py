@@ -1,34 +1,42 @@
+import argparse
+import hashlib
+import json
+import os
 import re
+import time
 import pandas as pd
 import numpy as np
 import faiss
-import pickle
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from sentence_transformers import SentenceTransformer
 
-# -----------------
-# Google Sheets Auth
-# -----------------
-# Test VC data set
-# SHEET_URL = "https://docs.google.com/spreadsheets/d/1JuOvz1yqnUPaZkA5iGVMxxtVJbECQhLGqz4XkCmd_sA/edit?gid=0"
-
-# original OPEN VC Dataset
-
-SHEET_URL = "https://docs.google.com/spreadsheets/d/1Hof1KGq4opP5UFf1xoRRkmCD9K56iI1XVixNgnR8NWI/edit?gid=0#gid=0"
-
-SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+from bm25_index import build_bm25
+from embedding_backend import BACKENDS, DEFAULT_BACKEND, load_embedder, resolve_backend
+from facet_filter import build_facets
+from m2_investor_match import (
+    BM25_PATH,
+    DATA_PATH,
+    EMBEDDINGS_PATH,
+    FACETS_PATH,
+    INDEX_PATH,
+    MODEL_NAME,
+    STORE_PATH,
+    manifest_path,
+    read_build_manifest,
+    search_params,
+    write_investor_store,
+)
+from sheet_snapshot import SNAPSHOT_PATH, load_snapshot, read_manifest, sync_snapshot
 
-creds = ServiceAccountCredentials.from_json_keyfile_name("service_account.json", SCOPE)
-client = gspread.authorize(creds)
 
-# Open the sheet
-spreadsheet = client.open_by_url(SHEET_URL)
-worksheet = spreadsheet.get_worksheet(0)  # First sheet
-data = worksheet.get_all_records()
+def load_investor_dataframe(sync=False, path=SNAPSHOT_PATH):
+    """Investors from the local sheet snapshot; ``sync=True`` (or no snapshot yet) pulls the sheet first."""
+    if sync or read_manifest(path) is None:
+        df, changed = sync_snapshot(path=path)
+        print(f"🔄 Synced the sheet snapshot ({'updated' if changed else 'unchanged'}).")
+        return df
+    manifest = read_manifest(path)
+    print(f"📂 Using sheet snapshot from {manifest['synced_at']} ({manifest['rows']} rows); --sync to refresh.")
+    return load_snapshot(path)
 
-# Convert to DataFrame
-df = pd.DataFrame(data)
 
 # -----------------
 # Preprocessing
@@ -41,25 +49,338 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
-df['final_investment_thesis_clean'] = df['Final Investment thesis'].apply(clean_text)
+
+def _hash64(value):
+    # Stable, non-negative int64 (FAISS ids are signed 64-bit)
+    digest = hashlib.sha256(value.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") & 0x7FFF_FFFF_FFFF_FFFF
+
+
+def assign_investor_ids(df):
+    """Give every row a stable ``investor_id`` derived from name + website.
+
+    Exact duplicate name/website pairs are disambiguated by their occurrence
+    number, so the same sheet always produces the same ids.
+    """
+    name = df.get('Investor name', pd.Series("", index=df.index)).astype(str).str.strip().str.lower()
+    website = df.get('Website', pd.Series("", index=df.index)).astype(str).str.strip().str.lower()
+    key = name + "|" + website
+    occurrence = key.groupby(key).cumcount().astype(str)
+    key = key + "#" + occurrence
+    df['investor_id'] = np.array([_hash64(k) for k in key], dtype="int64")
+    return df
+
+
+def preprocess(df):
+    df = df.reset_index(drop=True)
+    df['final_investment_thesis_clean'] = df['Final Investment thesis'].apply(clean_text)
+    df['thesis_hash'] = [
+        hashlib.sha256(t.encode("utf-8")).hexdigest() for t in df['final_investment_thesis_clean']
+    ]
+    return assign_investor_ids(df)
+
+
+# -----------------
+# Encode & index
+# -----------------
+def encode_theses(model, texts):
+    embeddings = model.encode(list(texts), show_progress_bar=True)
+    embeddings = np.array(embeddings, dtype="float32")
+    faiss.normalize_L2(embeddings)  # for cosine similarity
+    return embeddings
+
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+
+
+def _default_nlist(n):
+    # ~4*sqrt(n) lists, but keep >= 39 training points per list (FAISS guidance)
+    return int(max(1, min(4 * np.sqrt(n), n // 39)))
+
+
+def index_factory_string(index_type, dimension, n, nlist=None, pq_m=0, hnsw_m=32):
+    if pq_m and dimension % pq_m:
+        raise ValueError(f"--pq {pq_m} must divide the embedding dimension {dimension}")
+    if index_type == "flat":
+        return "Flat" if not pq_m else f"PQ{pq_m}"
+    if index_type == "ivf":
+        return f"IVF{nlist or _default_nlist(n)},{f'PQ{pq_m}' if pq_m else 'Flat'}"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m}_PQ{pq_m}" if pq_m else f"HNSW{hnsw_m},Flat"
+    raise ValueError(f"Unknown index type: {index_type}")
+
+
+def _inner_index(index):
+    # The index doing the search: unwraps IDMap/IDMap2, native-id IVF is returned as is
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def make_index(embeddings, ids, index_type="flat", nlist=None, pq_m=0, hnsw_m=32):
+    """Build an inner-product index of the requested kind, searched by investor id.
+
+    ``flat`` is exact; ``ivf`` and ``hnsw`` are approximate and tuned at query
+    time with ``nprobe`` / ``efSearch``. ``pq_m`` > 0 adds product quantization
+    with that many sub-quantizers (8 bits each).
+    """
+    dimension = embeddings.shape[1]
+    spec = index_factory_string(index_type, dimension, len(embeddings), nlist, pq_m, hnsw_m)
+    inner = faiss.index_factory(dimension, spec, faiss.METRIC_INNER_PRODUCT)
+    if not inner.is_trained:
+        inner.train(embeddings)
+    if faiss.try_extract_index_ivf(inner) is not None:
+        # IVF lists store ids natively. An IDMap2 around them would compact its id
+        # map on remove_ids while the lists keep their old sequence numbers.
+        inner.add_with_ids(embeddings, ids)
+        return inner
+    # IDMap2 keeps ids reconstructable for the other index types (HNSW has no native ids)
+    index = faiss.IndexIDMap2(inner)
+    index.add_with_ids(embeddings, ids)
+    return index
+
+
+def build_full_index(df, model, **index_options):
+    embeddings = encode_theses(model, df['final_investment_thesis_clean'])
+    return make_index(embeddings, df['investor_id'].to_numpy(), **index_options), embeddings
+
+
+# -----------------
+# Recall / latency report
+# -----------------
+def recall_report(index, embeddings, ids, k=10, n_queries=200, seed=0):
+    """Print recall@k and per-query latency of ``index`` against an exact flat search."""
+    rng = np.random.default_rng(seed)
+    queries = embeddings[rng.choice(len(embeddings), size=min(n_queries, len(embeddings)), replace=False)]
+
+    exact = faiss.IndexIDMap(faiss.IndexFlatIP(embeddings.shape[1]))
+    exact.add_with_ids(embeddings, ids)
+
+    def timed(idx, params=None):
+        start = time.perf_counter()
+        _, labels = idx.search(queries, k, params=params)
+        return labels, (time.perf_counter() - start) * 1000 / len(queries)
+
+    truth, flat_ms = timed(exact)
+    inner = _inner_index(index)
+    nlist = getattr(faiss.try_extract_index_ivf(inner), "nlist", 0)
+    if nlist:
+        sweep = [("nprobe", p) for p in (1, 2, 4, 8, 16, 32, 64, 128) if p <= nlist]
+    elif hasattr(inner, "hnsw"):
+        sweep = [("efSearch", e) for e in (16, 32, 64, 128, 256, 512)]
+    else:
+        sweep = [("-", None)]
+
+    print(f"\n📊 Recall@{k} vs exact flat index ({len(queries)} queries, flat: {flat_ms:.3f} ms/query)")
+    print(f"{'param':>10} {'value':>6} {'recall':>8} {'ms/query':>9} {'speedup':>8}")
+    for name, value in sweep:
+        params = search_params(index, nprobe=value if name == "nprobe" else None,
+                                ef_search=value if name == "efSearch" else None)
+        labels, ms = timed(index, params)
+        recall = np.mean([len(np.intersect1d(a[a >= 0], b[b >= 0])) / k for a, b in zip(labels, truth)])
+        print(f"{name:>10} {str(value or '-'):>6} {recall:>8.3f} {ms:>9.3f} {flat_ms / max(ms, 1e-9):>7.1f}x")
+
+
+def update_index_incremental(df, model, old_df, index, old_embeddings):
+    """Re-encode only new/changed theses and drop deleted investors in place.
+
+    Returns the updated index and the embedding matrix for ``df`` (unchanged
+    rows are copied from ``old_embeddings``).
+    """
+    old_hashes = dict(zip(old_df['investor_id'], old_df['thesis_hash']))
+    new_ids = df['investor_id'].to_numpy()
+
+    changed = np.array(
+        [old_hashes.get(i) != h for i, h in zip(new_ids, df['thesis_hash'])], dtype=bool
+    )
+    deleted = np.setdiff1d(old_df['investor_id'].to_numpy(), new_ids)
+
+    # Changed rows are removed and re-added with their fresh embedding
+    stale = np.concatenate([deleted, new_ids[changed & df['investor_id'].isin(old_hashes).to_numpy()]])
+    if len(stale):
+        index.remove_ids(stale.astype("int64"))
+
+    embeddings = np.empty((len(df), index.d), dtype="float32")
+    old_positions = pd.Index(old_df['investor_id'].to_numpy()).get_indexer(new_ids[~changed])
+    embeddings[~changed] = old_embeddings[old_positions]
+    if changed.any():
+        embeddings[changed] = encode_theses(model, df.loc[changed, 'final_investment_thesis_clean'])
+        index.add_with_ids(embeddings[changed], new_ids[changed])
+
+    print(f"ℹ️ Incremental update: {int(changed.sum())} new/changed, {len(deleted)} removed, "
+          f"{len(df) - int(changed.sum())} unchanged.")
+    return index, embeddings
+
+
+def _load_previous_build(index_path, data_path, embeddings_path=EMBEDDINGS_PATH, backend=DEFAULT_BACKEND):
+    """``(old_df, index, embeddings, manifest)`` of a build that can be updated in place, else None."""
+    manifest = read_build_manifest(index_path)
+    if manifest is None or manifest.get("model_name") != MODEL_NAME:
+        return None
+    # Unchanged rows keep their stored vectors, so they must come from the same backend
+    if manifest.get("embedding_backend", DEFAULT_BACKEND) != backend:
+        return None
+    if not all(os.path.exists(p) for p in (index_path, data_path, embeddings_path)):
+        return None
+    old_df = pd.read_pickle(data_path)
+    if not {'investor_id', 'thesis_hash'}.issubset(old_df.columns):
+        return None
+    embeddings = np.load(embeddings_path, mmap_mode="r")
+    if len(embeddings) != len(old_df):
+        return None
+    index = faiss.read_index(index_path)
+    inner = _inner_index(index)
+    if inner is index:
+        # Without an IDMap only IVF indexes hold investor ids
+        if faiss.try_extract_index_ivf(index) is None:
+            return None
+    elif hasattr(inner, "hnsw") or faiss.try_extract_index_ivf(inner) is not None:
+        # HNSW graphs can't drop vectors in place; IVF inside an IDMap (older
+        # builds) goes out of sync with its id map on remove_ids
+        return None
+    return old_df, index, embeddings, manifest
+
 
 # -----------------
-# Load model & encode
+# Build manifest
 # -----------------
-model = SentenceTransformer("sentence-transformers/all-distilroberta-v1")
-embeddings = model.encode(df['final_investment_thesis_clean'].tolist(), show_progress_bar=True)
-embeddings = np.array(embeddings, dtype="float32")
+def dataset_hash(df):
+    """Hash of what was embedded: investor ids and their cleaned-thesis hashes, in row order."""
+    digest = hashlib.sha256()
+    for investor_id, thesis_hash in zip(df['investor_id'], df['thesis_hash']):
+        digest.update(f"{investor_id}:{thesis_hash}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_manifest(df, embeddings, index_options, backend=DEFAULT_BACKEND):
+    snapshot = read_manifest()
+    options = dict(index_options)
+    options["factory"] = index_factory_string(
+        options["index_type"], embeddings.shape[1], len(embeddings),
+        options.get("nlist"), options.get("pq_m", 0), options.get("hnsw_m", 32),
+    )
+    return {
+        "model_name": MODEL_NAME,
+        "embedding_backend": backend,
+        "dimension": int(embeddings.shape[1]),
+        "normalized": True,
+        "metric": "inner_product",
+        "rows": int(len(df)),
+        "dataset_hash": dataset_hash(df),
+        "snapshot_hash": snapshot.get("content_hash") if snapshot else None,
+        "embeddings_path": EMBEDDINGS_PATH,
+        "index": options,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
 
 # -----------------
-# Store in FAISS
+# Atomic saves
 # -----------------
-dimension = embeddings.shape[1]
-faiss.normalize_L2(embeddings)  # for cosine similarity
-index = faiss.IndexFlatIP(dimension)
-index.add(embeddings)
+def _atomic_replace(path, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_npy(path, array):
+    # np.save appends ".npy" to bare paths; a file object keeps the tmp name
+    with open(path, "wb") as f:
+        np.save(f, np.ascontiguousarray(array, dtype="float32"))
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def save_outputs(index, df, embeddings, manifest, index_path=INDEX_PATH, data_path=DATA_PATH,
+                 store_path=STORE_PATH, embeddings_path=EMBEDDINGS_PATH, bm25_path=BM25_PATH,
+                 facets_path=FACETS_PATH):
+    # Index first: the matcher tolerates ids that are missing from the frame
+    _atomic_replace(index_path, lambda p: faiss.write_index(index, p))
+    _atomic_replace(data_path, lambda p: df.to_pickle(p))
+    write_investor_store(df, store_path)  # what the matcher actually loads
+    _atomic_replace(embeddings_path, lambda p: _write_npy(p, embeddings))
+    # Lexical side of hybrid matching; rebuilt in full, it is cheap next to encoding
+    build_bm25(df['final_investment_thesis_clean']).save(bm25_path)
+    build_facets(df).save(facets_path)  # attribute bitmaps for filtered matching
+    # Manifest last: it describes a complete build
+    _atomic_replace(manifest_path(index_path), lambda p: _write_json(p, manifest))
+
+
+def rebuild_from_embeddings(index_options, report=False):
+    """Build a new index over the saved embeddings, without the model or the sheet."""
+    manifest = read_build_manifest(INDEX_PATH)
+    if manifest is None or not os.path.exists(EMBEDDINGS_PATH):
+        raise SystemExit("❌ No saved embeddings; run a full build first.")
+    df = pd.read_pickle(DATA_PATH)
+    embeddings = np.load(EMBEDDINGS_PATH, mmap_mode="r")
+    if len(embeddings) != len(df) or manifest.get("dataset_hash") != dataset_hash(df):
+        raise SystemExit(f"❌ {EMBEDDINGS_PATH} does not match {DATA_PATH}; run a full build first.")
+
+    started = time.perf_counter()
+    ids = df['investor_id'].to_numpy()
+    index = make_index(np.ascontiguousarray(embeddings), ids, **index_options)
+    manifest = {**build_manifest(df, embeddings, index_options, manifest.get("embedding_backend", DEFAULT_BACKEND)),
+                "snapshot_hash": manifest.get("snapshot_hash")}
+    _atomic_replace(INDEX_PATH, lambda p: faiss.write_index(index, p))
+    _atomic_replace(manifest_path(INDEX_PATH), lambda p: _write_json(p, manifest))
+    print(f"✅ Rebuilt a {manifest['index']['factory']} index over {len(df)} stored embeddings "
+          f"in {time.perf_counter() - started:.1f}s.")
+    if report:
+        recall_report(index, embeddings, ids)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Embed investor theses into a FAISS index.")
+    parser.add_argument("--sync", action="store_true",
+                        help="Pull the Google Sheet into the local snapshot before building.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Re-encode only new/changed theses and drop deleted investors from the existing index.")
+    parser.add_argument("--from-embeddings", action="store_true",
+                        help="Rebuild only the index (e.g. another --index-type) from the saved embeddings.")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat",
+                        help="flat (exact), ivf or hnsw (approximate, for large datasets).")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default ~4*sqrt(n)).")
+    parser.add_argument("--pq", type=int, default=0, metavar="M",
+                        help="Compress vectors with product quantization using M sub-quantizers.")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="HNSW neighbours per node.")
+    parser.add_argument("--report", action="store_true",
+                        help="Print a recall-vs-latency sweep against the exact flat index.")
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help="Embedding inference backend (default: EMBEDDING_BACKEND or torch).")
+    args = parser.parse_args(argv)
+    index_options = dict(index_type=args.index_type, nlist=args.nlist, pq_m=args.pq, hnsw_m=args.hnsw_m)
+
+    if args.from_embeddings:
+        rebuild_from_embeddings(index_options, report=args.report)
+        return
+
+    backend = resolve_backend(args.backend)
+    df = preprocess(load_investor_dataframe(sync=args.sync))
+    model = load_embedder(MODEL_NAME, backend)
+
+    previous = _load_previous_build(INDEX_PATH, DATA_PATH, backend=backend) if args.incremental else None
+    if args.incremental and previous is None:
+        print(f"ℹ️ No updatable {MODEL_NAME} build (flat or IVF, {backend} backend, with saved embeddings); "
+              "doing a full rebuild.")
+    if previous is not None:
+        old_df, index, old_embeddings, old_manifest = previous
+        index, embeddings = update_index_incremental(df, model, old_df, index, old_embeddings)
+        # The index keeps the structure it was built with
+        index_options = {k: v for k, v in old_manifest.get("index", index_options).items() if k != "factory"}
+    else:
+        index, embeddings = build_full_index(df, model, **index_options)
+
+    # Save for later
+    save_outputs(index, df, embeddings, build_manifest(df, embeddings, index_options, backend))
+
+    if args.report:
+        recall_report(index, embeddings, df['investor_id'].to_numpy())
+
+    print(f"✅ Stored {len(df)} investors from the sheet snapshot into FAISS.")
 
-# Save for later
-faiss.write_index(index, "investor_index.faiss")
-df.to_pickle("investor_data.pkl")
 
-print(f"✅ Stored {len(df)} investors from Google Sheet into FAISS.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Diversity re-ranking of over-fetched match candidates.
+
+Both strategies work on the stored (normalized) investor vectors of the
+candidates and compute all pairwise similarities with one matrix product:
+
+- ``dedup`` walks the candidates best-first and drops every one whose cosine
+  similarity to an already kept candidate reaches ``threshold`` (sister funds
+  with copy-pasted theses). Dropped candidates suppress nothing, so a chain
+  of near-duplicates does not remove funds that differ from every kept one.
+- ``mmr`` (maximal marginal relevance) picks candidates that trade relevance
+  against similarity to what is already picked; ``diversity`` 0 keeps the
+  original order, 1 only maximizes novelty. Only the ``k`` greedy picks are a
+  Python loop; each pick is a vectorized update over all candidates.
+"""
+import numpy as np
+
+RERANK_METHODS = ("mmr", "dedup")
+
+
+def _relative(values):
+    # Scores relative to the best candidate, so cosine and fused scores share a scale
+    values = np.asarray(values, dtype="float32")
+    low, high = values.min(), values.max()
+    if low >= 0 and high > 0:
+        return values / high
+    return (values - low) / (high - low) if high > low else np.ones_like(values)
+
+
+def dedup_order(vectors, threshold=0.95):
+    """Positions of candidates (already best-first) that are not near-duplicates of a better one."""
+    if len(vectors) < 2:
+        return np.arange(len(vectors))
+    close = (vectors @ vectors.T) >= threshold
+    suppressed = np.zeros(len(vectors), dtype=bool)
+    kept = []
+    for i in range(len(vectors)):
+        if not suppressed[i]:
+            kept.append(i)
+            suppressed |= close[i]
+    return np.asarray(kept, dtype="int64")
+
+
+def mmr_order(vectors, relevance, k, diversity=0.5):
+    """Positions of up to ``k`` candidates in maximal-marginal-relevance order."""
+    n = len(vectors)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype="int64")
+    relevance = _relative(relevance)
+    sims = vectors @ vectors.T
+    closest = np.zeros(n, dtype="float32")  # max similarity to anything picked so far
+    available = np.ones(n, dtype=bool)
+    picked = np.empty(k, dtype="int64")
+    for step in range(k):
+        gain = np.where(available, (1 - diversity) * relevance - diversity * closest, -np.inf)
+        pick = int(np.argmax(gain))
+        picked[step] = pick
+        available[pick] = False
+        closest = np.maximum(closest, sims[pick]) if step else sims[pick].astype("float32")
+    return picked
+
+
+def rerank(vectors, scores, k, method="mmr", diversity=0.5, threshold=0.95):
+    """Positions (into the best-first candidate list) of the ``k`` re-ranked results."""
+    if method == "dedup":
+        return dedup_order(vectors, threshold)[:k]
+    if method == "mmr":
+        return mmr_order(vectors, scores, k, diversity)
+    raise ValueError(f"Unknown re-ranking {method!r}; choose one of {', '.join(RERANK_METHODS)}.")
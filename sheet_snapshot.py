@@ -0,0 +1,150 @@
+"""Local Parquet snapshot of the investor Google Sheet.
+
+    python sheet_snapshot.py           # pull the sheet, rewrite the snapshot only if it changed
+    python sheet_snapshot.py --force   # rewrite even if unchanged
+
+The snapshot (``investor_snapshot.parquet``) holds every cell as a string, in
+sheet row order. A sidecar manifest (``investor_snapshot.manifest.json``)
+records the content hash, shape and sync time, so unchanged pulls leave both
+files untouched and downstream builds can tell which sheet state they used.
+The vectorizer reads the snapshot instead of calling the Sheets API.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+# Test VC data set
+# SHEET_URL = "https://docs.google.com/spreadsheets/d/1JuOvz1yqnUPaZkA5iGVMxxtVJbECQhLGqz4XkCmd_sA/edit?gid=0"
+
+# original OPEN VC Dataset
+SHEET_URL = "https://docs.google.com/spreadsheets/d/1Hof1KGq4opP5UFf1xoRRkmCD9K56iI1XVixNgnR8NWI/edit?gid=0#gid=0"
+
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+SERVICE_ACCOUNT_FILE = "service_account.json"
+SNAPSHOT_PATH = os.getenv("INVESTOR_SNAPSHOT_PATH", "investor_snapshot.parquet")
+
+
+def manifest_path(path=SNAPSHOT_PATH):
+    return f"{os.path.splitext(path)[0]}.manifest.json"
+
+
+def open_worksheet(sheet_url=SHEET_URL, worksheet=0):
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    creds = ServiceAccountCredentials.from_json_keyfile_name(SERVICE_ACCOUNT_FILE, SCOPE)
+    spreadsheet = gspread.authorize(creds).open_by_url(sheet_url)
+    return spreadsheet.get_worksheet(worksheet)
+
+
+def content_hash(values):
+    """Hash of the raw cell grid; equal hashes mean an identical sheet."""
+    digest = hashlib.sha256()
+    for row in values:
+        digest.update(json.dumps(row, ensure_ascii=False).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def frame_from_values(values):
+    """DataFrame from ``worksheet.get_all_values()`` output (header row first).
+
+    Columns without a header are dropped and repeated headers get a ``.1``,
+    ``.2``... suffix, since Parquet needs unique column names.
+    """
+    if not values:
+        return pd.DataFrame()
+    header, rows = values[0], values[1:]
+    width = max([len(header)] + [len(r) for r in rows])
+    rows = [list(r) + [""] * (width - len(r)) for r in rows]
+
+    keep, names, seen = [], [], {}
+    for i in range(width):
+        name = header[i].strip() if i < len(header) else ""
+        if not name:
+            continue
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        keep.append(i)
+        names.append(name if not count else f"{name}.{count}")
+    return pd.DataFrame([[r[i] for i in keep] for r in rows], columns=names, dtype=object)
+
+
+def read_manifest(path=SNAPSHOT_PATH):
+    try:
+        with open(manifest_path(path), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _atomic_replace(path, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def save_snapshot(values, source="", path=SNAPSHOT_PATH, force=False):
+    """Write ``values`` to the snapshot unless it already holds the same content.
+
+    Returns ``(df, changed)``.
+    """
+    digest = content_hash(values)
+    df = frame_from_values(values)
+    manifest = read_manifest(path)
+    if not force and manifest and manifest.get("content_hash") == digest and os.path.exists(path):
+        return df, False
+
+    _atomic_replace(path, lambda p: df.to_parquet(p, index=False))
+    manifest = {
+        "source": source,
+        "content_hash": digest,
+        "rows": len(df),
+        "columns": list(df.columns),
+        "synced_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    # Manifest last: it only ever describes a fully written snapshot
+    _atomic_replace(manifest_path(path), lambda p: _write_json(p, manifest))
+    return df, True
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def sync_snapshot(sheet_url=SHEET_URL, worksheet=0, path=SNAPSHOT_PATH, force=False):
+    """Pull the sheet into the snapshot; returns ``(df, changed)``."""
+    values = open_worksheet(sheet_url, worksheet).get_all_values()
+    return save_snapshot(values, source=sheet_url, path=path, force=force)
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """Read the local snapshot (run ``python sheet_snapshot.py`` first)."""
+    if not os.path.exists(path) or read_manifest(path) is None:
+        raise FileNotFoundError(f"No investor snapshot at {path}; run `python sheet_snapshot.py` first.")
+    return pd.read_parquet(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pull the investor Google Sheet into a local Parquet snapshot.")
+    parser.add_argument("--sheet-url", default=SHEET_URL)
+    parser.add_argument("--worksheet", type=int, default=0, help="Worksheet position (0 = first).")
+    parser.add_argument("--path", default=SNAPSHOT_PATH)
+    parser.add_argument("--force", action="store_true", help="Rewrite the snapshot even if the sheet is unchanged.")
+    args = parser.parse_args(argv)
+
+    df, changed = sync_snapshot(args.sheet_url, args.worksheet, args.path, args.force)
+    manifest = read_manifest(args.path)
+    if changed:
+        print(f"✅ Saved {len(df)} investors to {args.path} ({manifest['content_hash'][:12]}).")
+    else:
+        print(f"ℹ️ Sheet unchanged since {manifest['synced_at']}; {args.path} left as is.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import random
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+
+def _col_letters(col: int) -> str:
+    letters = ""
+    while col > 0:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _a1(row: int, col: int) -> str:
+    return f"{_col_letters(col)}{row}"
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    # gspread.exceptions.APIError exposes the HTTP response (and ``code`` in gspread 6)
+    code = getattr(exc, "code", None)
+    if isinstance(code, int):
+        return code
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+class SheetWriteBuffer:
+    """Collects single-cell updates and writes them with ``worksheet.batch_update``.
+
+    Updates are flushed once ``flush_size`` cells are pending or ``flush_interval``
+    seconds have passed since the last flush (checked on ``add``), and on
+    ``close``. Flushes are spaced to stay under ``max_writes_per_minute`` API
+    calls, and quota (429) or transient 5xx errors are retried with exponential
+    backoff. Vertically adjacent cells in one column are sent as a single range.
+    Any object with a gspread-style ``batch_update(data)`` method works, which
+    makes it easy to test against a fake worksheet. ``on_flush`` receives the
+    ``(row, col, value)`` cells of every successful write.
+    """
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        worksheet,
+        flush_size: int = 50,
+        flush_interval: float = 30.0,
+        max_writes_per_minute: int = 50,
+        max_retries: int = 6,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+        on_flush: Optional[Callable[[List[Tuple[int, int, str]]], None]] = None,
+    ) -> None:
+        self.worksheet = worksheet
+        self.on_flush = on_flush
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = flush_interval
+        self.min_write_gap = 60.0 / max_writes_per_minute if max_writes_per_minute > 0 else 0.0
+        self.max_retries = max_retries
+        self._sleep = sleep
+        self._clock = clock
+        self._pending: List[Tuple[int, int, str]] = []
+        self._lock = threading.Lock()
+        self._last_flush = clock()
+        self._last_write: Optional[float] = None
+        self.cells_written = 0
+        self.api_calls = 0
+
+    def add(self, row: int, col: int, value) -> None:
+        with self._lock:
+            self._pending.append((row, col, "" if value is None else str(value)))
+            due = self.flush_interval is not None and self._clock() - self._last_flush >= self.flush_interval
+            if len(self._pending) >= self.flush_size or due:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "SheetWriteBuffer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        # Flush even on error so finished work isn't lost
+        self.close()
+
+    @staticmethod
+    def _ranges(cells: List[Tuple[int, int, str]]) -> List[dict]:
+        # Later writes to the same cell win
+        latest = {}
+        for row, col, value in cells:
+            latest[(row, col)] = value
+
+        runs = []  # [col, first_row, last_row, values]
+        for row, col in sorted(latest, key=lambda rc: (rc[1], rc[0])):
+            if runs and runs[-1][0] == col and runs[-1][2] == row - 1:
+                runs[-1][2] = row
+                runs[-1][3].append([latest[(row, col)]])
+            else:
+                runs.append([col, row, row, [[latest[(row, col)]]]])
+
+        data = []
+        for col, first, last, values in runs:
+            cell_range = _a1(first, col) if first == last else f"{_a1(first, col)}:{_a1(last, col)}"
+            data.append({"range": cell_range, "values": values})
+        return data
+
+    def _flush_locked(self) -> None:
+        self._last_flush = self._clock()
+        if not self._pending:
+            return
+        cells, self._pending = self._pending, []
+        data = self._ranges(cells)
+
+        attempt = 0
+        while True:
+            # Keep under the per-minute write quota
+            if self._last_write is not None and self.min_write_gap:
+                wait = self.min_write_gap - (self._clock() - self._last_write)
+                if wait > 0:
+                    self._sleep(wait)
+            try:
+                self._last_write = self._clock()
+                self.api_calls += 1
+                self.worksheet.batch_update(data)
+                break
+            except Exception as e:
+                status = _status_code(e)
+                if status not in self.RETRY_STATUS or attempt >= self.max_retries:
+                    # Put the cells back so a later flush (or close) can retry them
+                    self._pending = cells + self._pending
+                    raise
+                delay = min(64.0, 2 ** attempt) + random.uniform(0, 1)
+                print(f"⏳ Sheets API returned {status}; retrying in {delay:.1f}s...")
+                self._sleep(delay)
+                attempt += 1
+
+        self.cells_written += len(cells)
+        self._last_flush = self._clock()
+        if self.on_flush is not None:
+            self.on_flush(cells)
@@ -7,8 +7,9 @@ import streamlit as st
 from dotenv import load_dotenv
 from urllib.parse import urlparse
 
+from gemini_client import get_gemini_model, resolve_model_name
 from m1_analyze_company import analyze_company
-from m2_investor_match import find_matching_investors
+from m2_investor_match import get_matcher
 from m3_email_sender import send_personalized_emails
 
 hide_theme_switcher = """
@@ -32,6 +33,21 @@ st.markdown(hide_menu, unsafe_allow_html=True)
 
 st.markdown(hide_theme_switcher, unsafe_allow_html=True)
 
+
+# Shared, per-server-process resources. Every user session reuses the same
+# embedding model, FAISS index, investor frame and Gemini handle instead of
+# rebuilding them on each rerun.
+@st.cache_resource(show_spinner="Loading investor index...")
+def load_investor_matcher():
+    return get_matcher().warmup()
+
+
+@st.cache_resource(show_spinner=False)
+def load_gemini_model(model_name: str, api_key: str):
+    # The key is part of the cache key so rotating it in .env takes effect
+    return get_gemini_model(model_name)
+
+
 def show_landing_page():
     """Display the landing page with about and how it works content"""
     # Landing Page - Combined About Us + How It Works
@@ -288,6 +304,13 @@ def show_landing_page():
     st.markdown('</div>', unsafe_allow_html=True)
 
 
+def _session_gemini_model():
+    api_key = os.getenv("GEMINI_API_KEY", "").strip()
+    if not api_key:
+        return None
+    return load_gemini_model(resolve_model_name(), api_key)
+
+
 def show_tool_interface():
     """Display the main tool interface"""
     # Navigation buttons
@@ -320,6 +343,11 @@ def show_tool_interface():
 
         st.divider()
         top_k = st.slider("Number of investors to match", min_value=1, max_value=25, value=10)
+        skip_duplicates = st.checkbox(
+            "Skip near-duplicate funds",
+            value=False,
+            help="Drop sister funds whose thesis is almost identical to a better match.",
+        )
 
     # Persist results across reruns
     if "summary_text" not in st.session_state:
@@ -378,8 +406,13 @@ def show_tool_interface():
             st.error("Please enter a valid URL")
             return
 
+        gemini_model = _session_gemini_model()
+        if gemini_model is None:
+            st.error("GEMINI_API_KEY is not configured.")
+            return
+
         with st.spinner("Analyzing company with Gemini..."):
-            summary_text = analyze_company(company_name_input, website)
+            summary_text = analyze_company(company_name_input, website, model=gemini_model)
         if not summary_text:
             st.error("Could not analyze the company. Please enter a valid URL.")
             return
@@ -389,7 +422,9 @@ def show_tool_interface():
         st.session_state.company_name_main = company_name_input
 
         with st.spinner("Finding matching investors..."):
-            st.session_state.matches_df = find_matching_investors(summary_text, top_k=top_k)
+            st.session_state.matches_df = load_investor_matcher().find(
+                summary_text, top_k=top_k, rerank="dedup" if skip_duplicates else None
+            )
 
     # Show analysis if present
     if st.session_state.summary_text:
@@ -459,6 +494,7 @@ def show_tool_interface():
                     email_column="Email",
                     on_log=push_log,
                     on_progress=push_progress,
+                    model=_session_gemini_model(),
                 )
             progress_bar.progress(100, text="Completed")
             st.success("Done.")
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import cloudscraper
+
+from sqlite_cache import SQLiteCache, cache_path
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+DEFAULT_MAX_SESSIONS = 256
+
+
+class FetchResult(NamedTuple):
+    url: str
+    status: int
+    text: str
+    from_cache: bool  # served from the page cache (fresh hit or 304)
+
+
+class PageFetcher:
+    """Shared homepage fetcher for company analysis and investor enrichment.
+
+    - One cloudscraper session per host, reused across calls (connection
+      keep-alive, Cloudflare clearance cookies). Requests to the same host are
+      serialized; different hosts run in parallel. At most ``max_sessions``
+      hosts keep a session (and its open sockets); the least recently used
+      one is closed when another host needs a slot.
+    - Pages are kept in an on-disk cache with their ETag/Last-Modified and
+      revalidated with conditional GETs, so unchanged sites come back as 304s.
+      Entries younger than ``max_age`` seconds are served without any request.
+    - At most ``max_bytes`` of each body is read.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[SQLiteCache] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        timeout: float = 15,
+        max_age: float = 0,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+    ) -> None:
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_age = max_age
+        self.max_sessions = max(1, max_sessions)
+        self._sessions = OrderedDict()  # host -> (session, host lock), least recently used first
+        self._lock = threading.Lock()
+
+    def _session_for(self, host: str):
+        evicted = []
+        with self._lock:
+            entry = self._sessions.get(host)
+            if entry is None:
+                entry = self._sessions[host] = (cloudscraper.create_scraper(), threading.Lock())
+                while len(self._sessions) > self.max_sessions:
+                    evicted.append(self._sessions.popitem(last=False)[1])
+            else:
+                self._sessions.move_to_end(host)
+        for session, host_lock in evicted:
+            # Wait for a request still running on it, then release its sockets
+            with host_lock:
+                session.close()
+        return entry
+
+    def close(self) -> None:
+        """Close every pooled session."""
+        with self._lock:
+            entries = list(self._sessions.values())
+            self._sessions.clear()
+        for session, host_lock in entries:
+            with host_lock:
+                session.close()
+
+    def _read_capped(self, response) -> bytes:
+        chunks, size = [], 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            if not chunk:
+                continue
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_bytes:
+                break
+        return b"".join(chunks)[:self.max_bytes]
+
+    def fetch(self, url: str) -> FetchResult:
+        """GET ``url`` (raises on network/HTTP errors like ``requests`` does)."""
+        url = url.strip()
+        cached = self.cache.get_json(url) if self.cache is not None else None
+        if cached and self.max_age and time.time() - cached.get("fetched_at", 0) < self.max_age:
+            return FetchResult(url, cached.get("status", 200), cached["text"], True)
+
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        session, host_lock = self._session_for(urlsplit(url).netloc.lower())
+        with host_lock:
+            with session.get(url, timeout=self.timeout, headers=headers, stream=True) as response:
+                if response.status_code == 304 and cached:
+                    cached["fetched_at"] = time.time()
+                    self.cache.set_json(url, cached)
+                    return FetchResult(url, cached.get("status", 200), cached["text"], True)
+                response.raise_for_status()
+                body = self._read_capped(response)
+                encoding = response.encoding or "utf-8"
+                status = response.status_code
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+
+        text = body.decode(encoding, errors="replace")
+        if self.cache is not None:
+            self.cache.set_json(url, {
+                "text": text,
+                "status": status,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": time.time(),
+            })
+        return FetchResult(url, status, text, False)
+
+    def fetch_text(self, url: str) -> str:
+        return self.fetch(url).text
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher() -> PageFetcher:
+    """Process-wide fetcher configured from ``PAGE_CACHE_*`` env vars (``PAGE_CACHE_TTL=0`` disables caching)."""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            ttl = float(os.getenv("PAGE_CACHE_TTL", str(30 * 24 * 3600)))
+            cache = None
+            if ttl > 0:
+                cache = SQLiteCache(
+                    os.getenv("PAGE_CACHE_PATH", cache_path("pages.sqlite3")),
+                    ttl_seconds=ttl,
+                    max_bytes=int(float(os.getenv("PAGE_CACHE_MAX_MB", "500")) * 1024 * 1024),
+                )
+            _fetcher = PageFetcher(
+                cache=cache,
+                max_bytes=int(os.getenv("PAGE_MAX_BYTES", str(DEFAULT_MAX_BYTES))),
+                max_age=float(os.getenv("PAGE_CACHE_MAX_AGE", "3600")),
+                max_sessions=int(os.getenv("PAGE_MAX_SESSIONS", str(DEFAULT_MAX_SESSIONS))),
+            )
+    return _fetcher